@@ -0,0 +1,143 @@
+# Standard
+import queue
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .stats import stats
+from .render import fit_image
+
+# Browsers show frames with no or a tiny delay at this speed
+DEFAULT_DURATION = 100
+
+
+class Animation:
+    """Frames of an animated image, decoded and fitted a few ahead in a worker thread.
+
+    The Tk thread only picks up frames that are ready, so a slow decode
+    delays the animation but never the event loop. Fitted frames are kept
+    in a size bounded LRU so loops don't decode them again.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        padding: float,
+        frame_size: tuple[int, int],
+        budget: int = 64 * 1024 * 1024,
+        ahead: int = 4,
+    ) -> None:
+        self.path = path
+        self.padding = padding
+        self.budget = budget
+        self.frame_size = frame_size
+        self.ready: queue.Queue[tuple[Image.Image, int, tuple[int, int]]] = queue.Queue(
+            maxsize=ahead
+        )
+        self.stopped = threading.Event()
+        self.done = threading.Event()
+        self.error: Exception | None = None
+        self.frames: OrderedDict[int, tuple[Image.Image, int]] = OrderedDict()
+        self.fitted_size: tuple[int, int] | None = None
+        self.total = 0
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    @property
+    def finished(self) -> bool:
+        """True once the worker ended and every frame it made was shown."""
+        return self.done.is_set() and self.ready.empty()
+
+    def next(self, frame_size: tuple[int, int]) -> tuple[Image.Image, int] | None:
+        """Return the next fitted frame and its duration in milliseconds, if ready."""
+        self.frame_size = frame_size
+
+        while True:
+            try:
+                fitted, duration, size = self.ready.get_nowait()
+            except queue.Empty:
+                return None
+
+            # Frames fitted before a resize are skipped
+            if size == frame_size:
+                return fitted, duration
+
+    def close(self) -> None:
+        """Stop the worker, it closes the image on its own."""
+        self.stopped.set()
+
+    def run(self) -> None:
+        try:
+            with Image.open(self.path) as image:
+                if getattr(image, "is_animated", False):
+                    self.play(image)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def play(self, image: Image.Image) -> None:
+        position = 0
+        count: int | None = None
+
+        while not self.stopped.is_set():
+            frame_size = self.frame_size
+
+            try:
+                fitted, duration = self.frame(image, position, frame_size)
+            except EOFError:
+                # Past the last frame, loop back to the first one
+                count = position
+                position = 0
+                continue
+
+            position += 1
+
+            if count and position >= count:
+                position = 0
+
+            # Blocks while enough frames are ahead, waking up to see if it was stopped
+            while not self.stopped.is_set():
+                try:
+                    self.ready.put((fitted, duration, frame_size), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    @stats.timed("animation_frame")
+    def frame(
+        self, image: Image.Image, index: int, frame_size: tuple[int, int]
+    ) -> tuple[Image.Image, int]:
+        # Frames fitted to another size are of no use anymore
+        if frame_size != self.fitted_size:
+            self.fitted_size = frame_size
+            self.frames.clear()
+            self.total = 0
+
+        cached = self.frames.get(index)
+
+        if cached:
+            self.frames.move_to_end(index)
+            return cached
+
+        # Seeking forward decodes only the frames in between, a frame
+        # before the current one makes the decoder start over
+        image.seek(index)
+        duration = int(image.info.get("duration") or 0)
+
+        if duration < 20:
+            duration = DEFAULT_DURATION
+
+        fitted = fit_image(image.convert("RGBA"), frame_size, self.padding)
+        self.frames[index] = fitted, duration
+        self.total += fitted.width * fitted.height * 4
+
+        while self.total > self.budget and len(self.frames) > 1:
+            _, (evicted, _) = self.frames.popitem(last=False)
+            self.total -= evicted.width * evicted.height * 4
+
+        return fitted, duration
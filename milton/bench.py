@@ -0,0 +1,258 @@
+# Standard
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from collections.abc import Callable, Iterable
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .cache import DisplayCache
+from .decoder import DecodePool
+from .index import ImageIndex
+from .images import ImageList
+from .loader import ImageLoader
+from .phash import dhash
+from .scanner import DirListing, Scanner
+from .render import (
+    Letterbox,
+    decode_image,
+    fit_image,
+    fit_size,
+    letterbox,
+    read_header,
+)
+from .words import NounIndex, pick_words, read_noun_list
+from .defaults import bg_color, formats, padding
+
+
+def log(message: str) -> None:
+    sys.stderr.write(message + "\n")
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Nearest rank percentile of already sorted samples."""
+    index = max(0, round(percent / 100 * len(samples)) - 1)
+    return samples[min(index, len(samples) - 1)]
+
+
+def measure(name: str, run: Callable[[], object], count: int) -> dict[str, object]:
+    """Run a function count times and summarize the latencies."""
+    samples = []
+
+    for _ in range(count):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    total = sum(samples)
+
+    return {
+        "name": name,
+        "count": count,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(count / total, 2) if total else None,
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+    }
+
+
+def make_tree(
+    root: Path, files: int, dirs: int, mix: list[str], size: tuple[int, int]
+) -> list[Path]:
+    """Write a tree of synthetic images with the given format mix."""
+    paths = []
+    templates: dict[str, Image.Image] = {}
+
+    for n in range(files):
+        ext = mix[n % len(mix)]
+        directory = root / f"d{n % dirs:04}" / f"s{n % 3}"
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if ext not in templates:
+            image = Image.merge(
+                "RGB",
+                [Image.effect_noise(size, 64) for _ in range(3)],
+            )
+
+            templates[ext] = image.convert("P") if ext == "gif" else image
+
+        path = directory / f"img{n:06}.{ext}"
+        templates[ext].save(path)
+        paths.append(path)
+
+    return paths
+
+
+def bench_scan(root: Path, work: Path, repeat: int) -> Iterable[dict[str, object]]:
+    scanner = Scanner(formats, log)
+
+    def scan() -> None:
+        image_list = ImageList()
+
+        def on_dir(listing: DirListing) -> None:
+            image_list.add_dir(listing.path, listing.names)
+
+        scanner.scan(str(root), on_dir)
+
+    yield measure("scan", scan, repeat)
+
+    index = ImageIndex(work / "index.db", scanner, log)
+    index.scan(str(root))
+    yield measure("scan_indexed", lambda: index.scan(str(root)), repeat)
+    yield measure("index_load", lambda: index.load(str(root)), repeat)
+
+
+def bench_load(
+    paths: list[Path], work: Path, frame_size: tuple[int, int]
+) -> Iterable[dict[str, object]]:
+    images = iter(paths)
+
+    def decode() -> None:
+        decode_image(next(images), frame_size, padding)
+
+    yield measure("decode", decode, len(paths))
+    images = iter(paths)
+    yield measure("read_header", lambda: read_header(next(images)), len(paths))
+    images = iter(paths)
+    yield measure("dhash", lambda: dhash(next(images)), len(paths))
+
+    # Start the worker before timing the jobs
+    pool = DecodePool(log, workers=1)
+    pool.decode(paths[0], frame_size, padding)
+    images = iter(paths)
+
+    yield measure(
+        "decode_pool",
+        lambda: pool.decode(next(images), frame_size, padding),
+        len(paths),
+    )
+
+    pool.stop()
+
+    loader = ImageLoader(padding)
+    images = iter(paths)
+    yield measure("load", lambda: loader.load(next(images), frame_size), len(paths))
+
+    cache = DisplayCache(work / "cache", 1024 * 1024 * 1024, log)
+    cached_loader = ImageLoader(padding, cache)
+
+    for path in paths:
+        cached_loader.load(path, frame_size)
+
+    images = iter(paths)
+
+    yield measure(
+        "load_cached",
+        lambda: cached_loader.load(next(images), frame_size),
+        len(paths),
+    )
+
+
+def bench_render(
+    paths: list[Path], frame_size: tuple[int, int], repeat: int
+) -> Iterable[dict[str, object]]:
+    sources = [decode_image(path, frame_size, padding)[0] for path in paths[:20]]
+    sizes = [(random.randint(1, 8000), random.randint(1, 8000)) for _ in range(1000)]
+    items = iter(sizes * repeat)
+
+    yield measure(
+        "fit_size",
+        lambda: fit_size(next(items), frame_size, padding),
+        len(sizes) * repeat,
+    )
+
+    def render() -> None:
+        fitted = fit_image(random.choice(sources), frame_size, padding)
+        letterbox(fitted, frame_size, bg_color)
+
+    yield measure("render", render, repeat * 10)
+    canvas = Letterbox(bg_color)
+
+    def render_reused() -> None:
+        fitted = fit_image(random.choice(sources), frame_size, padding)
+        canvas.render(fitted, frame_size)
+
+    yield measure("render_reused", render_reused, repeat * 10)
+
+
+def bench_words(work: Path, repeat: int) -> Iterable[dict[str, object]]:
+    nouns_path = Path(__file__).parent / "nouns.txt"
+    index_path = work / "nouns.bin"
+    yield measure("read_nouns", lambda: read_noun_list(nouns_path), repeat)
+    yield measure(
+        "build_nouns", lambda: NounIndex.build(nouns_path, index_path), repeat
+    )
+    yield measure("open_nouns", lambda: NounIndex.open(nouns_path, index_path), repeat)
+    noun_list = read_noun_list(nouns_path)
+    yield measure("select_words", lambda: pick_words(noun_list, 3), repeat * 1000)
+    noun_index = NounIndex.open(nouns_path, index_path)
+
+    yield measure(
+        "select_words_mapped", lambda: pick_words(noun_index, 3), repeat * 1000
+    )
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="milton.bench", description="Benchmark the milton hot paths headless"
+    )
+
+    parser.add_argument("--files", type=int, default=200, help="Synthetic images")
+    parser.add_argument("--dirs", type=int, default=20, help="Top level directories")
+    parser.add_argument("--formats", default="jpg,png", help="Format mix, like jpg,png")
+    parser.add_argument("--image-size", type=parse_size, default=(1600, 1200))
+    parser.add_argument("--frame-size", type=parse_size, default=(580, 330))
+    parser.add_argument("--repeat", type=int, default=20, help="Repeats per timing")
+    parser.add_argument("--source", type=Path, help="Use an existing tree instead")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="milton-bench-") as tmp:
+        work = Path(tmp)
+
+        if args.source:
+            root = args.source
+            index = ImageIndex(work / "paths.db", Scanner(formats, log), log)
+            listed = index.scan(str(root))
+            paths = [path for n in range(listed.slots) if (path := listed.get(n))]
+        else:
+            root = work / "tree"
+            mix = [ext.strip(". ") for ext in args.formats.split(",")]
+            log(f"Writing {args.files} synthetic images...")
+            paths = make_tree(root, args.files, max(1, args.dirs), mix, args.image_size)
+
+        results = [
+            *bench_scan(root, work, args.repeat),
+            *bench_load(paths, work, args.frame_size),
+            *bench_render(paths, args.frame_size, args.repeat),
+            *bench_words(work, args.repeat),
+        ]
+
+    report = {
+        "files": len(paths),
+        "frame_size": list(args.frame_size),
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Standard
+import os
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Callable
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .stats import stats
+
+
+class DisplayCache:
+    """Disk cache of fitted display renders with a size bounded LRU."""
+
+    # Bumped whenever renders change, so stale entries are never hit
+    version = 3
+
+    # Transparent renders keep their alpha, the letterbox pastes through it
+    alpha_modes = ("RGBA", "LA")
+
+    def __init__(
+        self, directory: Path, budget: int, log: Callable[[str], None]
+    ) -> None:
+        self.directory = directory
+        self.budget = budget
+        self.log = log
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.total = 0
+        self.loaded = False
+
+    def load_entries(self) -> None:
+        """Build the LRU order from the files already on disk."""
+        self.loaded = True
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = [e for e in os.scandir(self.directory) if e.is_file()]
+        except OSError as e:
+            self.log(f"Error reading cache directory: {e}")
+            return
+
+        # The modification time is bumped on every hit, so it keeps the LRU order
+        files.sort(key=lambda e: e.stat().st_mtime)
+
+        for entry in files:
+            if entry.name.endswith(".tmp"):
+                continue
+
+            size = entry.stat().st_size
+            self.entries[entry.name] = size
+            self.total += size
+
+    def key(self, file_path: Path, frame_size: tuple[int, int]) -> str | None:
+        """Build a cache key from the file identity and the target size."""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+
+        width, height = frame_size
+        ident = f"{self.version}|{file_path}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}"
+        # No extension, the format is read from the content
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    @stats.timed("cache_get")
+    def get(self, file_path: Path, frame_size: tuple[int, int]) -> Image.Image | None:
+        """Return the cached render for this file and size, if any."""
+        name = self.key(file_path, frame_size)
+
+        if not name:
+            return None
+
+        with self.lock:
+            if not self.loaded:
+                self.load_entries()
+
+            if name not in self.entries:
+                return None
+
+            self.entries.move_to_end(name)
+
+        cache_path = self.directory / name
+
+        try:
+            with Image.open(cache_path) as pil_image:
+                image = pil_image.copy()
+
+            os.utime(cache_path)
+        except OSError:
+            self.forget(name)
+            return None
+
+        return image
+
+    @stats.timed("cache_put")
+    def put(
+        self, file_path: Path, frame_size: tuple[int, int], image: Image.Image
+    ) -> None:
+        """Store a render and evict the least recently used ones over budget."""
+        name = self.key(file_path, frame_size)
+
+        if not name:
+            return
+
+        cache_path = self.directory / name
+        tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+
+        with self.lock:
+            if not self.loaded:
+                self.load_entries()
+
+        if image.mode in self.alpha_modes:
+            fmt, options = "PNG", {"compress_level": 1}
+        else:
+            image = image.convert("RGB")
+            fmt, options = "JPEG", {"quality": 90}
+
+        try:
+            image.save(tmp_path, fmt, **options)
+            tmp_path.replace(cache_path)
+            size = cache_path.stat().st_size
+        except OSError as e:
+            self.log(f"Error writing cache file: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self.lock:
+            self.total -= self.entries.pop(name, 0)
+            self.entries[name] = size
+            self.total += size
+            self.evict()
+
+    def forget(self, name: str) -> None:
+        with self.lock:
+            self.total -= self.entries.pop(name, 0)
+
+    def evict(self) -> None:
+        while self.total > self.budget and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.total -= size
+            (self.directory / name).unlink(missing_ok=True)
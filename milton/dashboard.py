@@ -1,29 +1,46 @@
 # Standard
-import os
+from __future__ import annotations
 import time
-import json
-import random
 import threading
-from typing import Any
+from typing import TYPE_CHECKING, Any
+from collections.abc import Callable, Sequence
 from pathlib import Path
 from tkinter import ttk, filedialog
 import tkinter as tk
 
-# Libraries
-from PIL import Image, ImageTk  # type: ignore
-
 # Modules
-from .state import State
+from .state import StateStore
+from .index import ImageIndex
+from .scanner import Scanner
+from .defaults import bg_color, default_source, formats, padding
+from .words import open_noun_list, pick_words
+from .pacer import Pacer
+from .stats import stats
+
+# PIL and the modules that use it are imported on first use,
+# so the window can be drawn before they are loaded
+if TYPE_CHECKING:
+    from PIL import Image, ImageTk
+    from .animation import Animation
+    from .loader import LoadedImage
+    from .prefetch import Prefetched
+    from .transition import Crossfade
 
 
 class Dashboard:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(
+        self,
+        root: tk.Tk,
+        startup: float | None = None,
+        rapid_interval: float = 0.5,
+        crossfade: float = 0.0,
+    ) -> None:
         self.rd_off = 999
         self.rd_fast = 1
         self.rd_normal = 5
         self.rd_slow = 10
         self.refresh_delay = self.rd_normal
-        self.bg_color = "#808080"
+        self.bg_color = bg_color
         self.button_height = 1
         self.font_size = 14
         self.font_size_2 = 13
@@ -33,16 +50,43 @@ class Dashboard:
         self.padx_1 = 5
         self.img_width = 300
         self.img_height = 200
-        self.stop_refresh = False
+        self.refresh_job: str | None = None
         self.state_file = Path(__file__).parent / Path("state.json")
-        self.image_padding = 0.8
+        self.state_store = StateStore(self.state_file, self.log)
+        self.index_file = Path(__file__).parent / Path("index.db")
+        self.nouns_index_file = Path(__file__).parent / Path("nouns.bin")
+        self.image_padding = padding
         self.button_color = "#d9d9d9"
         self.button_color_hover = "#cecece"
         self.button_text = "#000000"
         self.compact_breakpoint = 520
         self.bottom_layout_mode: str | None = None
         self.resize_job: str | None = None
-        self.current_pil_image: Image.Image | None = None
+        self.preview_job: str | None = None
+        self.window_size: tuple[int, int] | None = None
+        self.loaded_image: LoadedImage | None = None
+        self.pick_missed = False
+        self.prefetch_depth = 2
+        self.prefetch_workers = 2
+        self.decode_timeout = 30.0
+        self.decode_memory = 2 * 1024 * 1024 * 1024
+        self.load_cancel: threading.Event | None = None
+        self.refit_cancel: threading.Event | None = None
+        self.refit_key: tuple[Path, tuple[int, int]] | None = None
+        self.pick_attempts = 20
+        self.distinct_window = 100
+        self.distinct_distance = 10
+        self.animation: Animation | None = None
+        self.animation_job: str | None = None
+        self.cache_dir = Path(__file__).parent / Path("cache")
+        self.cache_budget = 256 * 1024 * 1024
+        self.scan_workers = 8
+        self.startup = startup
+        self.rapid_interval = rapid_interval
+        self.crossfade_time = crossfade
+
+        # Created in start, a render can run before that
+        self.crossfade: Crossfade | None = None
 
         self.root = root
         self.root.configure(bg=self.bg_color)
@@ -52,32 +96,87 @@ class Dashboard:
 
         self.load_state()
         self.create_main()
+        self.create_top()
         self.create_image()
         self.create_bottom()
         self.root.bind("<Configure>", self.on_window_resize)
         self.root.after_idle(self.handle_responsive_layout)
 
-        self.noun_list = self.read_noun_list()
-
-        self.current_image = None
-        self.image_list: list[Path] = []
-        self.supported_formats = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff")
+        self.noun_list: Sequence[str] = []
+        self.current_image: ImageTk.PhotoImage | None = None
+        self.supported_formats = formats
+        self.scanner = Scanner(self.supported_formats, self.log, self.scan_workers)
+        self.index = ImageIndex(self.index_file, self.scanner, self.log)
+        self.pacer = Pacer(root, self.rapid_interval, self.show_rapid_frame, self.log)
 
-        self.init_source()
         self.update_speed()
-        self.start()
+        self.root.after(0, self.start)
 
     def start(self) -> None:
-        self.scan_for_images()
-        self.root.after(100, self.do_start)
+        """Do the heavy initialization once the window has been drawn."""
+        self.root.update_idletasks()
+        self.log_startup("Window drawn")
+
+        from .cache import DisplayCache
+        from .decoder import DecodePool
+        from .loader import ImageLoader
+        from .prefetch import Prefetcher
+        from .render import Letterbox
+        from .selection import Selection
+        from .transition import Crossfade
+
+        self.letterbox = Letterbox(self.bg_color)
+
+        self.selection = Selection(
+            self.state,
+            self.index,
+            self.scanner,
+            self.state_store.save,
+            self.log,
+            self.pick_attempts,
+            self.distinct_window,
+            self.distinct_distance,
+        )
+        self.crossfade = Crossfade(self.root, self.show_image)
+
+        # One worker per prefetch thread plus one for the image on screen
+        self.decode_pool = DecodePool(
+            self.log,
+            workers=self.prefetch_workers + 1,
+            timeout=self.decode_timeout,
+            memory_limit=self.decode_memory,
+        )
+
+        self.loader = ImageLoader(
+            self.image_padding,
+            DisplayCache(self.cache_dir, self.cache_budget, self.log),
+            self.decode_pool,
+        )
+
+        self.prefetcher = Prefetcher(
+            self.selection.pick,
+            self.load,
+            self.log,
+            depth=self.prefetch_depth,
+            workers=self.prefetch_workers,
+        )
+
+        self.noun_list = self.read_noun_list()
+        self.init_source()
+        self.do_start()
+
+    def log_startup(self, milestone: str) -> None:
+        """Log the time since launch when measuring startup."""
+        if self.startup is None:
+            return
+
+        elapsed = (time.perf_counter() - self.startup) * 1000
+        self.log(f"{milestone} after {elapsed:.1f} ms")
 
     def do_start(self) -> None:
+        self.prefetcher.start()
         self.do_refresh()
-        self.start_refresh_thread()
-
-    def start_refresh_thread(self) -> None:
-        self.refresh_thd = threading.Thread(target=self.refresh_thread, daemon=True)
-        self.refresh_thd.start()
+        self.schedule_refresh()
 
     def create_main(self) -> None:
         self.main_frame = tk.Frame(self.root, bg=self.bg_color)
@@ -101,31 +200,55 @@ class Dashboard:
         self.main_frame.pack(fill="both", expand=True)
         self.main_frame.pack_propagate(False)
 
+    @stats.timed("create_top")
     def create_top(self) -> None:
-        for widget in self.top_frame.winfo_children():
-            widget.destroy()
-
         # Create a frame that contains the canvas
-        container = tk.Frame(self.top_frame, bg=self.bg_color)
-        container.pack(fill="both", expand=True)
+        self.top_container = tk.Frame(self.top_frame, bg=self.bg_color)
+        self.top_container.pack(fill="both", expand=True)
 
         # Create a canvas that will hold the labels
-        canvas = tk.Canvas(container, bg=self.bg_color, highlightthickness=0, height=38)
-        canvas.pack(fill="both", expand=True)
+        self.top_canvas = tk.Canvas(
+            self.top_container, bg=self.bg_color, highlightthickness=0, height=38
+        )
+
+        self.top_canvas.pack(fill="both", expand=True)
 
         # Create a frame inside the canvas to hold the labels
-        labels = tk.Frame(canvas, bg=self.bg_color, pady=3)
+        self.labels_frame = tk.Frame(self.top_canvas, bg=self.bg_color, pady=3)
+
+        # The labels are reused between refreshes, see sync_noun_labels
+        self.noun_labels: list[tk.Label] = []
+
+        # Create a window in the canvas to display the labels frame
+        self.labels_window = self.top_canvas.create_window(
+            (0, 0), window=self.labels_frame, anchor="nw"
+        )
+
+        # Bind events to update centering when sizes change
+        self.labels_frame.bind("<Configure>", self.update_scroll_and_center)
+        self.top_container.bind("<Configure>", self.update_scroll_and_center)
+
+        # Bind mousewheel event to canvas
+        self.top_canvas.bind("<MouseWheel>", self.on_labels_mousewheel)  # Windows
+        self.top_canvas.bind("<Button-4>", self.on_labels_mousewheel)  # Linux scroll up
+        self.top_canvas.bind(
+            "<Button-5>", self.on_labels_mousewheel
+        )  # Linux scroll down
+
+        self.sync_noun_labels()
 
+    @stats.timed("sync_noun_labels")
+    def sync_noun_labels(self) -> None:
+        """Grow or shrink the pool of noun labels to match the nouns setting."""
         # Convert nouns setting to int and ensure it's at least 1
         num_nouns = max(1, int(self.state.nouns))
 
-        # Create a list to store all noun labels
-        self.noun_labels = []
+        if num_nouns == len(self.noun_labels):
+            return
 
-        # Dynamically create the specified number of labels
-        for _i in range(num_nouns):
+        while len(self.noun_labels) < num_nouns:
             label = tk.Label(
-                labels,
+                self.labels_frame,
                 text="---",
                 font=("Arial", self.font_size),
                 height=self.button_height,
@@ -136,58 +259,51 @@ class Dashboard:
             label.pack(side=tk.LEFT, padx=self.padx_1)
             self.noun_labels.append(label)
 
-        # Create a window in the canvas to display the labels frame
-        canvas_window = canvas.create_window((0, 0), window=labels, anchor="nw")
-
-        # Function to precisely center the labels
-        def center_labels() -> None:
-            # Get the exact width of both containers
-            labels_width = labels.winfo_width()
-            container_width = container.winfo_width()
+        while len(self.noun_labels) > num_nouns:
+            self.noun_labels.pop().destroy()
 
-            # Calculate the center position
-            center_position = (container_width - labels_width) / 2
-
-            # Update the window position with the exact center
-            canvas.coords(canvas_window, center_position, 0)
+        # Force the frame to take the width it needs and update centering
+        self.labels_frame.update_idletasks()
+        self.center_labels()
 
-            # Update scroll region to reflect the full width of labels
-            canvas.configure(scrollregion=(0, 0, labels_width, labels.winfo_height()))
+    def center_labels(self) -> None:
+        """Precisely center the labels."""
+        # Get the exact width of both containers
+        labels_width = self.labels_frame.winfo_width()
+        container_width = self.top_container.winfo_width()
 
-        # Update function that handles both scrolling and centering
-        def update_scroll_and_center(event: Any = None) -> None:
-            # Force geometry update
-            labels.update_idletasks()
-            center_labels()
+        # Calculate the center position
+        center_position = (container_width - labels_width) / 2
 
-        # Bind events to update centering when sizes change
-        labels.bind("<Configure>", update_scroll_and_center)
-        container.bind("<Configure>", update_scroll_and_center)
-
-        # Add mousewheel scrolling (horizontal scroll with mousewheel)
-        def _on_mousewheel(event: Any) -> None:
-            # Only scroll if the content is wider than the container
-            if labels.winfo_width() > container.winfo_width():
-                # Scroll horizontally with the mousewheel
-                if hasattr(event, "delta"):  # Windows
-                    if event.delta < 0:  # Scroll right
-                        canvas.xview_scroll(1, "units")
-                    else:  # Scroll left
-                        canvas.xview_scroll(-1, "units")
-                elif hasattr(event, "num"):  # Linux
-                    if event.num == 5:  # Scroll right
-                        canvas.xview_scroll(1, "units")
-                    elif event.num == 4:  # Scroll left
-                        canvas.xview_scroll(-1, "units")
+        # Update the window position with the exact center
+        self.top_canvas.coords(self.labels_window, center_position, 0)
 
-        # Bind mousewheel event to canvas
-        canvas.bind("<MouseWheel>", _on_mousewheel)  # Windows
-        canvas.bind("<Button-4>", _on_mousewheel)  # Linux scroll up
-        canvas.bind("<Button-5>", _on_mousewheel)  # Linux scroll down
+        # Update scroll region to reflect the full width of labels
+        self.top_canvas.configure(
+            scrollregion=(0, 0, labels_width, self.labels_frame.winfo_height())
+        )
 
-        # Force the frame to take the width it needs and update centering
-        labels.update_idletasks()
-        center_labels()
+    def update_scroll_and_center(self, event: Any = None) -> None:
+        """Update function that handles both scrolling and centering."""
+        # Force geometry update
+        self.labels_frame.update_idletasks()
+        self.center_labels()
+
+    def on_labels_mousewheel(self, event: Any) -> None:
+        """Add mousewheel scrolling (horizontal scroll with mousewheel)."""
+        # Only scroll if the content is wider than the container
+        if self.labels_frame.winfo_width() > self.top_container.winfo_width():
+            # Scroll horizontally with the mousewheel
+            if hasattr(event, "delta"):  # Windows
+                if event.delta < 0:  # Scroll right
+                    self.top_canvas.xview_scroll(1, "units")
+                else:  # Scroll left
+                    self.top_canvas.xview_scroll(-1, "units")
+            elif hasattr(event, "num"):  # Linux
+                if event.num == 5:  # Scroll right
+                    self.top_canvas.xview_scroll(1, "units")
+                elif event.num == 4:  # Scroll left
+                    self.top_canvas.xview_scroll(-1, "units")
 
     def create_image(self) -> None:
         self.image_frame = tk.Frame(
@@ -290,7 +406,7 @@ class Dashboard:
         self.speed_combo = ttk.Combobox(
             self.bottom_frame,
             width=6,
-            values=["Pause", "Fast", "Normal", "Slow"],
+            values=["Pause", "Rapid", "Fast", "Normal", "Slow"],
             textvariable=self.speed_var,
             font=("Arial", self.font_size_2),
             style="Normal.TCombobox",
@@ -337,6 +453,44 @@ class Dashboard:
         self.nouns_combo.set(self.state.nouns)
         self.nouns_combo.bind("<<ComboboxSelected>>", self.on_nouns_change)
 
+        self.order_var = tk.StringVar(value="Random")
+
+        self.order_combo = ttk.Combobox(
+            self.bottom_frame,
+            width=7,
+            values=["Random", "Shuffle", "Distinct"],
+            textvariable=self.order_var,
+            font=("Arial", self.font_size_2),
+            style="Normal.TCombobox",
+            justify=tk.CENTER,
+            state="readonly",
+        )
+
+        self.order_combo.bind("<Enter>", on_combobox_enter)
+        self.order_combo.bind("<Leave>", on_combobox_leave)
+
+        self.order_combo.set(self.state.order)
+        self.order_combo.bind("<<ComboboxSelected>>", self.on_order_change)
+
+        self.shape_var = tk.StringVar(value="Any")
+
+        self.shape_combo = ttk.Combobox(
+            self.bottom_frame,
+            width=9,
+            values=["Any", "Landscape", "Portrait"],
+            textvariable=self.shape_var,
+            font=("Arial", self.font_size_2),
+            style="Normal.TCombobox",
+            justify=tk.CENTER,
+            state="readonly",
+        )
+
+        self.shape_combo.bind("<Enter>", on_combobox_enter)
+        self.shape_combo.bind("<Leave>", on_combobox_leave)
+
+        self.shape_combo.set(self.state.shape)
+        self.shape_combo.bind("<<ComboboxSelected>>", self.on_shape_change)
+
         self.close_button = ttk.Button(
             self.bottom_frame,
             text="Close",
@@ -348,34 +502,36 @@ class Dashboard:
 
     def close(self) -> None:
         """Close the application."""
+        self.selection.stop()
+        self.stop_animation()
+        self.cancel_crossfade()
+        self.prefetcher.stop()
+        self.decode_pool.stop()
+        self.state_store.stop()
         self.root.quit()
 
     def log(self, message: str) -> None:
         """Log messages to the console."""
         print(message)  # noqa
 
-    def read_noun_list(self) -> list[str]:
-        """Read the noun list from file."""
+    def read_noun_list(self) -> Sequence[str]:
+        """Map the compiled noun index, building it from nouns.txt if needed."""
         try:
             # Construct the path to nouns.txt relative to this file's location
             nouns_path = Path(__file__).parent / "nouns.txt"
-
-            with nouns_path.open("r", encoding="utf-8") as f:
-                return [line.strip() for line in f if line.strip()]
+            return open_noun_list(nouns_path, self.nouns_index_file, self.log)
         except Exception as e:
             self.log(f"Error reading nouns.txt: {e}")
             return ["Error", "Loading", "Words"]
 
+    @stats.timed("select_words")
     def select_words(self) -> None:
         """Update labels with random words based on the number specified in settings."""
         try:
             num_nouns = len(self.noun_labels)
 
             # Select words from the noun list
-            if len(self.noun_list) >= num_nouns:
-                selected_words = random.sample(self.noun_list, num_nouns)
-            else:
-                selected_words = random.choices(self.noun_list, k=num_nouns)
+            selected_words = pick_words(self.noun_list, num_nouns)
 
             # Update each label with a selected word
             for i, label in enumerate(self.noun_labels):
@@ -383,27 +539,8 @@ class Dashboard:
         except Exception as e:
             self.log(f"Error updating labels: {e}")
 
-    def refresh_thread(self) -> None:
-        """Thread function to update labels every x minutes."""
-        thread_id = threading.get_ident()
-
-        while not self.stop_refresh:
-            # Sleep in smaller increments to check stop_refresh more frequently
-            for _ in range(int(self.refresh_delay * 60)):
-                if self.stop_refresh:
-                    self.log(f"Thread {thread_id}: Stopping early")
-                    return
-
-                time.sleep(1)
-
-            # Use after() to safely update UI from a non-main thread
-            if not self.stop_refresh:
-                # Pass a flag to indicate this was scheduled from background thread
-                self.root.after(0, lambda: self.refresh(from_thread=True))
-
     def get_default_source(self) -> str:
-        default_dir = Path(__file__).parent / "img" / "birds"
-        return self.state.source or str(default_dir)
+        return self.state.source or default_source
 
     def select_source(self) -> None:
         # Default to <cwd>/img/birds when no source is set
@@ -419,80 +556,126 @@ class Dashboard:
 
         if directory:
             self.state.source = directory
+            self.selection.reset_shuffle()
             self.scan_for_images()
+            self.prefetcher.clear()
             self.refresh()
             self.save_state()
 
     def load_state(self) -> None:
         """Load application state from state.json file."""
-        self.state_json = {}
-        self.state = State()
-
-        try:
-            if self.state_file.exists():
-                with self.state_file.open("r", encoding="utf-8") as f:
-                    self.state_json = json.load(f)
+        self.state = self.state_store.load()
 
-            self.state.source = self.state_json.get("source", "")
-            self.state.speed = self.state_json.get("speed", "Normal")
-            self.state.nouns = self.state_json.get("nouns", "3")
-
-            if not self.state.source:
-                self.state.source = self.get_default_source()
-        except Exception as e:
-            self.log(f"Error loading state file: {e}")
+        if not self.state.source:
+            self.state.source = self.get_default_source()
 
     def init_source(self) -> None:
         """Initialize the image source from the loaded state."""
-        self.load_state()
-
         if self.state.source:
             self.scan_for_images()
 
     def save_state(self) -> None:
-        """Save application state to state.json file."""
-        try:
-            state = {
-                "source": self.state.source,
-                "speed": self.state.speed,
-            }
-
-            with self.state_file.open("w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2)
-        except Exception as e:
-            self.log(f"Error saving state file: {e}")
+        """Save application state to state.json file in the background."""
+        self.state_store.save(self.state)
 
+    @stats.timed("scan_for_images")
     def scan_for_images(self) -> None:
+        """Load the stored index and rescan changes in the background."""
         if not self.state.source:
             return
 
-        self.image_list = []
+        # Both are called from the scan thread
+        def on_found() -> None:
+            self.root.after(0, self.show_first_image)
+
+        def on_filtered() -> None:
+            self.root.after(0, self.prefetcher.clear)
+
+        self.selection.scan(on_found, on_filtered)
+
+    def reload_images(self) -> None:
+        """Load the image list from the index again, with the current filter."""
+
+        # Called from the loading thread
+        def on_done() -> None:
+            self.root.after(0, self.prefetcher.clear)
 
-        for root, _, files in os.walk(self.state.source):
-            for file in files:
-                if file.lower().endswith(self.supported_formats):
-                    self.image_list.append(Path(root) / file)
+        self.selection.reload(on_done)
+
+    def show_first_image(self) -> None:
+        # Nothing could be picked while the list of a new source was loading
+        if not self.loaded_image or self.pick_missed:
+            self.show_random_image()
 
     def do_refresh(self) -> None:
-        self.create_top()
+        self.sync_noun_labels()
         self.show_random_image()
         self.select_words()
 
-    def refresh(self, from_thread: bool = False) -> None:
+    def refresh(self) -> None:
         """Update the display with new image and words."""
         self.do_refresh()
 
-        # Only restart the thread if this was triggered manually (not from the background thread)
-        # and if we're not in Pause mode
-        if not from_thread and (self.state.speed != "Pause"):
-            self.restart_refresh_thread()
+        # Count the delay from this refresh, whether manual or automatic
+        self.schedule_refresh()
+
+    def schedule_refresh(self) -> None:
+        """Schedule the next automatic refresh with the current delay."""
+        self.cancel_refresh()
+
+        if self.state.speed == "Pause":
+            return
+
+        if self.state.speed == "Rapid":
+            self.pacer.start()
+            return
+
+        delay = int(self.refresh_delay * 60 * 1000)
+        self.refresh_job = self.root.after(delay, self.on_refresh_timer)
+
+    def cancel_refresh(self) -> None:
+        self.pacer.stop()
+
+        if self.refresh_job:
+            self.root.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+    def show_rapid_frame(self) -> bool:
+        """Show the next prefetched image if one is ready, without waiting."""
+        item = self.prefetcher.take()
+
+        if not item:
+            return False
+
+        self.cancel_load()
+        self.show_prefetched(item)
+        self.select_words()
+        return True
+
+    def on_refresh_timer(self) -> None:
+        self.refresh_job = None
+        self.refresh()
 
     def show_random_image(self) -> None:
-        if not self.image_list:
+        self.cancel_load()
+        item = self.prefetcher.take()
+
+        if item:
+            self.pick_missed = False
+            self.show_prefetched(item)
             return
 
-        random_image_path = random.choice(self.image_list)
-        self.load_image(random_image_path)
+        random_image_path = self.selection.pick()
+        self.pick_missed = not random_image_path
+
+        if random_image_path:
+            self.load_image(random_image_path)
+
+    def show_prefetched(self, item: Prefetched) -> None:
+        """Swap in an image that was already decoded by the prefetcher."""
+        self.loaded_image = item.loaded
+        self.render_current_image(fade=True)
+        self.start_animation()
 
     def validate_number(self, p: str) -> bool:
         """Validate input to only allow numbers"""
@@ -517,8 +700,8 @@ class Dashboard:
         self.state.speed = self.speed_var.get()
         self.update_speed()
 
-        # Restart thread with new delay
-        self.restart_refresh_thread()
+        # Reschedule with the new delay
+        self.schedule_refresh()
 
         def reset() -> None:
             self.root.focus_set()
@@ -534,94 +717,305 @@ class Dashboard:
         self.root.focus_set()
         self.save_state()
 
-    def restart_refresh_thread(self) -> None:
-        """Safely stop and restart the refresh thread with the current delay."""
-        # Signal the existing thread to stop
-        self.stop_refresh = True
+    def on_order_change(self, event: Any = None) -> None:
+        """Handle order change events from the combobox."""
+        self.state.order = self.order_var.get()
+        self.root.focus_set()
+        self.prefetcher.clear()
+        self.save_state()
 
-        # If a thread exists and is running, wait for it to terminate
-        if (
-            hasattr(self, "refresh_thd")
-            and self.refresh_thd
-            and self.refresh_thd.is_alive()
-        ):
-            self.log(f"Waiting for thread {self.refresh_thd.ident} to terminate...")
-            # Wait for the thread to exit
-            self.refresh_thd.join(timeout=5.0)
-
-            # If thread is still alive after timeout
-            if self.refresh_thd.is_alive():
-                self.log(
-                    f"Warning: Thread {self.refresh_thd.ident} didn't terminate properly"
-                )
+    def load_image(self, file_path: Path) -> None:
+        """Load an image in a thread and render it when it is ready."""
+        frame_size = self.get_frame_size()
 
-                # Don't create a new thread if old one is stuck
-                return
+        if not self.frame_ready(frame_size):
+            self.root.after(100, lambda: self.load_image(file_path))
+            return
 
-        # Reset the flag and start a new thread only if we're not in "Pause" mode
-        if self.state.speed != "Pause":
-            self.stop_refresh = False
-            self.start_refresh_thread()
+        self.cancel_load()
+        cancel = self.load_cancel = threading.Event()
 
-    def load_image(self, file_path: Path) -> None:
-        """Load an image and trigger rendering so it stays responsive."""
-        try:
-            with Image.open(file_path) as pil_image:
-                self.current_pil_image = pil_image.copy()
+        threading.Thread(
+            target=self.load_thread,
+            args=(file_path, frame_size, cancel, self.finish_load),
+            daemon=True,
+        ).start()
+
+    def on_shape_change(self, event: Any = None) -> None:
+        """Handle shape change events from the combobox."""
+        self.state.shape = self.shape_var.get()
+        self.root.focus_set()
+        self.reload_images()
+        self.save_state()
+
+    @stats.timed("load_image")
+    def load_thread(
+        self,
+        file_path: Path,
+        frame_size: tuple[int, int],
+        cancel: threading.Event,
+        finish: Callable[[LoadedImage, threading.Event], None],
+    ) -> None:
+        from .decoder import DecodeCancelledError
 
-            self.render_current_image()
+        try:
+            loaded = self.load(file_path, frame_size, cancel)
+        except DecodeCancelledError:
+            return
         except Exception as e:
             self.log(f"Error loading image: {e}")
+            return
+
+        self.root.after(0, lambda: finish(loaded, cancel))
+
+    def load(
+        self,
+        file_path: Path,
+        frame_size: tuple[int, int],
+        cancel: threading.Event | None = None,
+    ) -> LoadedImage:
+        """Load through the loader, quarantining files that fail or time out."""
+        from .decoder import DecodeCancelledError
+
+        try:
+            return self.loader.load(file_path, frame_size, cancel)
+        except DecodeCancelledError:
+            raise
+        except Exception as e:
+            self.index.quarantine(file_path, f"{type(e).__name__}: {e}")
+            raise
+
+    def finish_load(self, loaded: LoadedImage, cancel: threading.Event) -> None:
+        # Drop the result if a newer refresh arrived while it was decoding
+        if cancel.is_set():
+            return
+
+        self.load_cancel = None
+        self.loaded_image = loaded
+        self.render_current_image(fade=True)
+        self.start_animation()
+
+    def refit_image(self, loaded: LoadedImage, frame_size: tuple[int, int]) -> None:
+        """Decode the image on screen again for a new frame size, in a thread."""
+        self.show_preview(loaded, frame_size)
+
+        # Already decoding for this size
+        if self.refit_cancel and self.refit_key == (loaded.path, frame_size):
+            return
+
+        self.cancel_refit()
+        cancel = self.refit_cancel = threading.Event()
+        self.refit_key = (loaded.path, frame_size)
+
+        threading.Thread(
+            target=self.load_thread,
+            args=(loaded.path, frame_size, cancel, self.finish_refit),
+            daemon=True,
+        ).start()
+
+    def finish_refit(self, loaded: LoadedImage, cancel: threading.Event) -> None:
+        if cancel.is_set():
+            return
+
+        self.refit_cancel = None
+        self.refit_key = None
+
+        # The image on screen may have changed in the meantime
+        if not self.loaded_image or self.loaded_image.path != loaded.path:
+            return
+
+        self.loaded_image = loaded
+        self.render_current_image()
+
+    def cancel_refit(self) -> None:
+        if self.refit_cancel:
+            self.refit_cancel.set()
+            self.refit_cancel = None
+            self.refit_key = None
+
+    def start_animation(self) -> None:
+        """Play the image on screen if it is an animated GIF."""
+        self.stop_animation()
+
+        if not self.loaded_image or self.loaded_image.path.suffix.lower() != ".gif":
+            return
+
+        from .animation import Animation
+
+        # The image is opened and decoded in the worker of the animation
+        self.animation = Animation(
+            self.loaded_image.path, self.image_padding, self.get_frame_size()
+        )
+        self.animation_job = self.root.after_idle(self.on_animation_timer)
+
+    def stop_animation(self) -> None:
+        if self.animation_job:
+            self.root.after_cancel(self.animation_job)
+            self.animation_job = None
+
+        if self.animation:
+            self.animation.close()
+            self.animation = None
+
+    def on_animation_timer(self) -> None:
+        self.animation_job = None
+        animation = self.animation
+        frame_size = self.get_frame_size()
 
-    def render_current_image(self) -> None:
+        if not animation:
+            return
+
+        if not self.frame_ready(frame_size):
+            self.animation_job = self.root.after(100, self.on_animation_timer)
+            return
+
+        frame = animation.next(frame_size)
+
+        if not frame:
+            # Not animated, or it failed, and the still image stays on screen
+            if animation.finished:
+                if animation.error:
+                    self.log(f"Error playing animation: {animation.error}")
+
+                self.stop_animation()
+                return
+
+            # The next frame is still being decoded
+            self.animation_job = self.root.after(10, self.on_animation_timer)
+            return
+
+        fitted, duration = frame
+        self.cancel_crossfade()
+        self.show_image(self.letterbox.render(fitted, frame_size))
+        self.animation_job = self.root.after(duration, self.on_animation_timer)
+
+    def cancel_crossfade(self) -> None:
+        if self.crossfade:
+            self.crossfade.cancel()
+
+    def cancel_load(self) -> None:
+        """Cancel the image that is still loading, if any."""
+        if self.load_cancel:
+            self.load_cancel.set()
+            self.load_cancel = None
+
+        self.cancel_refit()
+
+    def get_frame_size(self) -> tuple[int, int]:
+        return self.image_frame.winfo_width(), self.image_frame.winfo_height()
+
+    def frame_ready(self, frame_size: tuple[int, int]) -> bool:
+        frame_width, frame_height = frame_size
+        return frame_width > 1 and frame_height > 1
+
+    @stats.timed("render_current_image")
+    def render_current_image(self, fade: bool = False) -> None:
         """Render the currently loaded image to match the frame size."""
-        if not self.current_pil_image:
+        self.cancel_crossfade()
+
+        if not self.loaded_image:
             return
 
-        frame_width = self.image_frame.winfo_width()
-        frame_height = self.image_frame.winfo_height()
+        frame_size = self.get_frame_size()
 
-        if frame_width <= 1 or frame_height <= 1:
+        if not self.frame_ready(frame_size):
             self.root.after(100, self.render_current_image)
             return
 
-        pil_image = self.current_pil_image
-        img_width, img_height = pil_image.size
+        # Let the prefetcher fit upcoming images to the same size
+        self.prefetcher.set_frame_size(frame_size)
+
+        if self.loaded_image.frame_size != frame_size:
+            # A decode would block the UI, show a preview until the thread is done
+            if not self.loader.can_fit(self.loaded_image, frame_size):
+                self.refit_image(self.loaded_image, frame_size)
+                return
 
-        image_aspect = img_width / img_height
-        frame_aspect = frame_width / frame_height
+            try:
+                self.loaded_image = self.loader.fit(self.loaded_image, frame_size)
+            except Exception as e:
+                self.log(f"Error rendering image: {e}")
+                return
 
-        if image_aspect > frame_aspect:
-            new_width = frame_width
-            new_height = int(frame_width / image_aspect)
-        else:
-            new_height = frame_height
-            new_width = int(frame_height * image_aspect)
+        canvas = self.letterbox.canvas
+        crossfade = self.crossfade
 
-        max_height = int(frame_height * self.image_padding)
+        # Fade from what is on screen when there is something of the same size
+        if (
+            fade
+            and crossfade
+            and self.crossfade_time > 0
+            and self.state.speed != "Rapid"
+            and canvas
+            and canvas.size == frame_size
+        ):
+            crossfade.capture(canvas)
+            final_image = self.letterbox.render(self.loaded_image.fitted, frame_size)
+            crossfade.start(final_image, self.crossfade_time)
+        else:
+            final_image = self.letterbox.render(self.loaded_image.fitted, frame_size)
+            self.show_image(final_image)
 
-        if new_height > max_height:
-            new_height = max_height
-            new_width = int(max_height * image_aspect)
+    @stats.timed("photoimage")
+    def show_image(self, final_image: Image.Image) -> None:
+        from PIL import ImageTk
 
-        resized_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        final_image = Image.new("RGB", (frame_width, frame_height), self.bg_color)
+        tk_image = self.current_image
 
-        x_offset = (frame_width - new_width) // 2
-        y_offset = (frame_height - new_height) // 2
-        final_image.paste(resized_image, (x_offset, y_offset))
+        # Update the shown image in place unless the size changed
+        if tk_image and (tk_image.width(), tk_image.height()) == final_image.size:
+            tk_image.paste(final_image)
+        else:
+            tk_image = ImageTk.PhotoImage(final_image)
+            self.image_label.configure(image=tk_image)
+            self.current_image = tk_image
 
-        tk_image = ImageTk.PhotoImage(final_image)
-        self.image_label.configure(image=tk_image)
-        self.current_image = tk_image
+        if self.startup is not None:
+            self.log_startup("First frame")
+            self.startup = None
 
     def on_window_resize(self, event: Any) -> None:
         """Throttle resize handling to keep UI responsive."""
         if event.widget is not self.root:
             return
 
+        # Moving the window configures it too, without changing its size
+        if (event.width, event.height) == self.window_size:
+            return
+
+        self.window_size = (event.width, event.height)
+
+        # Draw a cheap preview right away and the final render once it settles
+        if not self.preview_job and self.loaded_image:
+            self.preview_job = self.root.after_idle(self.render_preview)
+
         self.schedule_resize_update()
 
+    def render_preview(self) -> None:
+        """Render the current image from its pyramid while the window resizes."""
+        self.preview_job = None
+        loaded = self.loaded_image
+        frame_size = self.get_frame_size()
+
+        if not loaded or not self.frame_ready(frame_size):
+            return
+
+        # The image on screen already fits
+        if frame_size == loaded.frame_size:
+            return
+
+        self.cancel_crossfade()
+        self.show_preview(loaded, frame_size)
+
+    def show_preview(self, loaded: LoadedImage, frame_size: tuple[int, int]) -> None:
+        from .render import Pyramid
+
+        if not loaded.pyramid:
+            loaded.pyramid = Pyramid(loaded.source or loaded.fitted)
+
+        preview = loaded.pyramid.preview(frame_size, self.image_padding)
+        self.show_image(self.letterbox.render(preview, frame_size))
+
     def schedule_resize_update(self) -> None:
         if self.resize_job:
             self.root.after_cancel(self.resize_job)
@@ -675,6 +1069,18 @@ class Dashboard:
             pady=self.wid_pad_y,
         )
 
+        self.order_combo.pack(
+            side=tk.LEFT,
+            padx=(0, self.wid_pad_x),
+            pady=self.wid_pad_y,
+        )
+
+        self.shape_combo.pack(
+            side=tk.LEFT,
+            padx=(0, self.wid_pad_x),
+            pady=self.wid_pad_y,
+        )
+
         self.refresh_button.pack(
             side=tk.LEFT,
             padx=(0, self.wid_pad_x),
@@ -692,6 +1098,8 @@ class Dashboard:
             self.select_source_btn,
             self.speed_combo,
             self.nouns_combo,
+            self.order_combo,
+            self.shape_combo,
             self.refresh_button,
             self.close_button,
         ]
@@ -0,0 +1,186 @@
+# Standard
+import sys
+import time
+import queue
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import Any
+from collections.abc import Callable
+from multiprocessing.connection import Connection
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .stats import stats
+from .render import decode_image
+
+
+class DecodeError(Exception):
+    """The image could not be decoded in a worker process."""
+
+
+class DecodeTimeoutError(DecodeError):
+    """The decode took longer than the time limit."""
+
+
+class DecodeCancelledError(DecodeError):
+    """The decode was no longer wanted."""
+
+
+def serve(conn: Connection, memory_limit: int) -> None:
+    """Decode the jobs sent through the pipe until it closes."""
+    if memory_limit and sys.platform != "win32":
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+        # The memory and time limits guard against decompression bombs instead
+        Image.MAX_IMAGE_PIXELS = None
+
+    while True:
+        try:
+            file_path, frame_size, padding = conn.recv()
+        except EOFError:
+            return
+
+        try:
+            image, full_size = decode_image(file_path, frame_size, padding)
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        else:
+            conn.send(("ok", image, full_size))
+
+
+class DecodeWorker:
+    """A worker process and the pipe it reads jobs from."""
+
+    def __init__(self, memory_limit: int) -> None:
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+
+        self.process = context.Process(
+            target=serve, args=(child_conn, memory_limit), daemon=True
+        )
+
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class DecodePool:
+    """Decode images in worker processes with a time and a memory limit.
+
+    A job that runs too long or gets cancelled kills its worker, which is
+    replaced on the next job, so a pathological file can't hang the caller.
+    Workers are started on first use.
+    """
+
+    def __init__(
+        self,
+        log: Callable[[str], None],
+        workers: int = 2,
+        timeout: float = 30.0,
+        memory_limit: int = 2 * 1024 * 1024 * 1024,
+    ) -> None:
+        self.log = log
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.stop_event = threading.Event()
+        self.idle: queue.Queue[DecodeWorker | None] = queue.Queue()
+
+        for _ in range(max(1, workers)):
+            self.idle.put(None)
+
+    def stop(self) -> None:
+        """Kill the idle workers, busy ones are killed when they notice."""
+        self.stop_event.set()
+
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+
+            if worker:
+                worker.kill()
+
+    @stats.timed("decode")
+    def decode(
+        self,
+        file_path: Path,
+        frame_size: tuple[int, int],
+        padding: float,
+        cancel: threading.Event | None = None,
+    ) -> tuple[Image.Image, tuple[int, int]]:
+        """Decode in a worker, blocking until it is done, cancelled or timed out."""
+        worker = self.acquire(file_path)
+
+        try:
+            worker.conn.send((file_path, frame_size, padding))
+            reply = self.wait(worker, file_path, cancel)
+        except (DecodeError, OSError):
+            worker.kill()
+            self.release(None)
+            raise
+
+        self.release(worker)
+
+        if reply[0] == "error":
+            raise DecodeError(reply[1])
+
+        return reply[1], reply[2]
+
+    def acquire(self, file_path: Path) -> DecodeWorker:
+        """Take an idle worker, starting it if needed."""
+        worker = self.idle.get()
+
+        if self.stop_event.is_set():
+            self.release(worker)
+            raise DecodeCancelledError(file_path)
+
+        if worker and worker.process.is_alive():
+            return worker
+
+        if worker:
+            worker.kill()
+
+        try:
+            return DecodeWorker(self.memory_limit)
+        except OSError:
+            self.release(None)
+            raise
+
+    def release(self, worker: DecodeWorker | None) -> None:
+        if worker and self.stop_event.is_set():
+            worker.kill()
+            worker = None
+
+        self.idle.put(worker)
+
+    def wait(
+        self, worker: DecodeWorker, file_path: Path, cancel: threading.Event | None
+    ) -> tuple[Any, ...]:
+        deadline = time.monotonic() + self.timeout
+
+        while not worker.conn.poll(0.05):
+            if self.stop_event.is_set() or (cancel and cancel.is_set()):
+                raise DecodeCancelledError(file_path)
+
+            if time.monotonic() > deadline:
+                self.log(f"Decoding {file_path} timed out, restarting the worker")
+                raise DecodeTimeoutError(file_path)
+
+        try:
+            reply: tuple[Any, ...] = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            # Killed by the kernel, most likely for running out of memory
+            self.log(f"Decoding {file_path} crashed the worker, restarting it")
+            raise DecodeError(file_path) from e
+
+        return reply
@@ -0,0 +1,10 @@
+# Standard
+from pathlib import Path
+
+# Shared by the window, the server and the benchmarks
+formats = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff")
+padding = 0.8
+bg_color = "#808080"
+
+# Shown until a source is picked
+default_source = str(Path(__file__).parent / "img" / "birds")
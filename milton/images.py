@@ -0,0 +1,159 @@
+# Standard
+import os
+import random
+import threading
+from array import array
+from pathlib import Path
+from collections.abc import Iterable
+
+# Marks a slot whose image was removed
+DEAD = 0xFFFFFFFF
+
+
+class ImageList:
+    """Thread safe, compact list of image paths.
+
+    Paths are stored as a directory table plus packed NUL terminated file
+    names, so an entry costs a few bytes more than its name. A Path is only
+    built for the entry that gets picked. Removed entries leave a dead slot
+    behind until enough of them pile up to compact the arrays.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.dirs: list[str] = []
+        self.dir_ids: dict[str, int] = {}
+        self.dir_slots: list[array[int]] = []
+        self.names = bytearray()
+        self.offsets: array[int] = array("Q")
+        self.slot_dirs: array[int] = array("I")
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def slots(self) -> int:
+        """Number of slots, including dead ones."""
+        return len(self.offsets)
+
+    def get(self, slot: int) -> Path | None:
+        """Return the path in a slot, or None if it was removed."""
+        with self.lock:
+            if slot >= len(self.offsets) or self.slot_dirs[slot] == DEAD:
+                return None
+
+            return self.path(slot)
+
+    def choice(self) -> Path | None:
+        """Return a random path, or None if the list is empty."""
+        with self.lock:
+            if not self.count:
+                return None
+
+            # Compaction keeps at least half of the slots alive
+            while True:
+                slot = random.randrange(len(self.offsets))
+
+                if self.slot_dirs[slot] != DEAD:
+                    return self.path(slot)
+
+    def add_dir(self, directory: str, names: Iterable[str]) -> None:
+        """Add the images of one directory."""
+        with self.lock:
+            self.add_names(directory, [os.fsencode(name) for name in names])
+
+    def add(self, paths: Iterable[Path]) -> None:
+        for directory, names in self.group(paths).items():
+            with self.lock:
+                self.add_names(directory, names)
+
+    def remove(self, paths: Iterable[Path]) -> None:
+        for directory, names in self.group(paths).items():
+            with self.lock:
+                self.remove_names(directory, set(names))
+
+        with self.lock:
+            if len(self.offsets) > 1024 and self.count < len(self.offsets) // 2:
+                self.compact()
+
+    def group(self, paths: Iterable[Path]) -> dict[str, list[bytes]]:
+        groups: dict[str, list[bytes]] = {}
+
+        for path in paths:
+            groups.setdefault(str(path.parent), []).append(os.fsencode(path.name))
+
+        return groups
+
+    def path(self, slot: int) -> Path:
+        directory = self.dirs[self.slot_dirs[slot]]
+        return Path(directory) / os.fsdecode(self.name(slot))
+
+    def name(self, slot: int) -> bytes:
+        start = self.offsets[slot]
+        return bytes(self.names[start : self.names.index(0, start)])
+
+    def dir_id(self, directory: str) -> int:
+        dir_id = self.dir_ids.get(directory)
+
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_ids[directory] = dir_id
+            self.dir_slots.append(array("I"))
+
+        return dir_id
+
+    def add_names(self, directory: str, names: list[bytes]) -> None:
+        dir_id = self.dir_id(directory)
+        slots = self.dir_slots[dir_id]
+        existing = {self.name(slot) for slot in slots}
+
+        for name in names:
+            if name in existing:
+                continue
+
+            existing.add(name)
+            slots.append(len(self.offsets))
+            self.offsets.append(len(self.names))
+            self.slot_dirs.append(dir_id)
+            self.names += name + b"\0"
+            self.count += 1
+
+    def remove_names(self, directory: str, names: set[bytes]) -> None:
+        dir_id = self.dir_ids.get(directory)
+
+        if dir_id is None:
+            return
+
+        kept: array[int] = array("I")
+
+        for slot in self.dir_slots[dir_id]:
+            if self.name(slot) in names:
+                self.slot_dirs[slot] = DEAD
+                self.count -= 1
+            else:
+                kept.append(slot)
+
+        self.dir_slots[dir_id] = kept
+
+    def compact(self) -> None:
+        """Drop dead slots and the names they still hold."""
+        names = bytearray()
+        offsets: array[int] = array("Q")
+        slot_dirs: array[int] = array("I")
+        dir_slots: list[array[int]] = [array("I") for _ in self.dirs]
+
+        for slot, dir_id in enumerate(self.slot_dirs):
+            if dir_id == DEAD:
+                continue
+
+            dir_slots[dir_id].append(len(offsets))
+            offsets.append(len(names))
+            slot_dirs.append(dir_id)
+            names += self.name(slot) + b"\0"
+
+        self.names = names
+        self.offsets = offsets
+        self.slot_dirs = slot_dirs
+        self.dir_slots = dir_slots
@@ -0,0 +1,603 @@
+# Standard
+import os
+import time
+import queue
+import sqlite3
+import threading
+from operator import itemgetter
+from itertools import groupby
+from pathlib import Path
+from contextlib import contextmanager
+from collections.abc import Callable, Generator
+
+# Modules
+from .stats import stats
+from .images import ImageList
+from .scanner import DirListing, Scanner
+
+MASK_64 = (1 << 64) - 1
+
+
+class ImageIndex:
+    """Persistent index of the images in a source, with per directory mtimes.
+
+    A rescan only lists directories whose mtime changed since the last scan,
+    every other directory is served from the stored index.
+
+    Image sizes and orientations are filled in by a later pass over the
+    headers, so images can be filtered by shape without opening them.
+
+    Perceptual hashes are filled in the same way, by the phash module. The
+    mtime and size of a file are stored with its metadata, so both are read
+    again when the file changes.
+
+    Files that failed to load are kept in a quarantine with their mtime, and
+    are skipped until they change.
+    """
+
+    def __init__(
+        self, db_path: Path, scanner: Scanner, log: Callable[[str], None]
+    ) -> None:
+        self.db_path = db_path
+        self.scanner = scanner
+        self.log = log
+        self.lock = threading.Lock()
+        self.quarantined: dict[str, int] = {}
+        self.migrated = False
+        self.commit_interval = 1.0
+        self.writes: queue.Queue[tuple[str, tuple[object, ...]]] = queue.Queue()
+        self.writer: threading.Thread | None = None
+        self.writer_lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def connect(self) -> Generator[sqlite3.Connection]:
+        """Open the database and run the block in a single transaction."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+
+        # WAL lets the UI read the stored index while a rescan is writing
+        conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS dirs (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                parent INTEGER,
+                mtime INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                dir INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                orientation INTEGER,
+                phash INTEGER,
+                mtime INTEGER,
+                size INTEGER,
+                PRIMARY KEY (dir, name)
+            );
+            CREATE TABLE IF NOT EXISTS quarantine (
+                path TEXT PRIMARY KEY,
+                mtime INTEGER NOT NULL,
+                reason TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checks (
+                source TEXT PRIMARY KEY,
+                finished REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+            """
+        )
+
+        try:
+            if not self.migrated:
+                self.migrate(conn)
+
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def reader(self) -> sqlite3.Connection:
+        """A connection kept open by the calling thread, for frequent reads."""
+        conn: sqlite3.Connection | None = getattr(self.local, "conn", None)
+
+        if not conn:
+            # Creates and migrates the tables first
+            with self.connect():
+                pass
+
+            conn = self.local.conn = sqlite3.connect(self.db_path, timeout=30)
+
+        return conn
+
+    def migrate(self, conn: sqlite3.Connection) -> None:
+        """Add the metadata columns to an index written by an older version."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+
+        for column in ("width", "height", "orientation", "phash", "mtime", "size"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE files ADD COLUMN {column} INTEGER")
+
+        conn.commit()
+        self.migrated = True
+
+    def source_filter(self, source: str) -> tuple[str, tuple[str, int, str]]:
+        """SQL condition matching the source directory and everything below it."""
+        prefix = source.rstrip(os.sep) + os.sep
+        condition = "(dirs.path = ? OR substr(dirs.path, 1, ?) = ?)"
+        return condition, (source, len(prefix), prefix)
+
+    def query_dirs(
+        self, conn: sqlite3.Connection, source: str
+    ) -> dict[str, tuple[int, int, int | None]]:
+        """Return id, mtime and parent of every stored directory in the source."""
+        condition, params = self.source_filter(source)
+
+        rows = conn.execute(
+            f"SELECT path, id, mtime, parent FROM dirs WHERE {condition}", params
+        )
+
+        return {path: (dir_id, mtime, parent) for path, dir_id, mtime, parent in rows}
+
+    def query_files(
+        self, conn: sqlite3.Connection, source: str
+    ) -> dict[int, list[str]]:
+        """Return the stored file names of every directory in the source."""
+        condition, params = self.source_filter(source)
+        files: dict[int, list[str]] = {}
+
+        rows = conn.execute(
+            "SELECT files.dir, files.name FROM files "
+            f"JOIN dirs ON dirs.id = files.dir WHERE {condition}",
+            params,
+        )
+
+        for dir_id, name in rows:
+            files.setdefault(dir_id, []).append(name)
+
+        return files
+
+    def shape_filter(self, shape: str) -> str:
+        """SQL condition matching the images of a shape, or those not read yet."""
+        if shape not in ("Landscape", "Portrait"):
+            return "1"
+
+        # Orientations 5 to 8 turn the image on its side
+        op = ">" if shape == "Landscape" else "<"
+
+        return (
+            "(files.width IS NULL OR CASE WHEN files.orientation BETWEEN 5 AND 8 "
+            f"THEN files.height {op} files.width ELSE files.width {op} files.height END)"
+        )
+
+    def load(self, source: str, shape: str = "Any") -> ImageList:
+        """Return the images stored for the source without touching the disk."""
+        source = os.path.normpath(source)
+        image_list = ImageList()
+        condition, params = self.source_filter(source)
+
+        try:
+            with self.connect() as conn:
+                rows = conn.execute(
+                    "SELECT dirs.path, files.name FROM files "
+                    f"JOIN dirs ON dirs.id = files.dir WHERE {condition} "
+                    f"AND {self.shape_filter(shape)} ORDER BY files.dir",
+                    params,
+                )
+
+                for path, names in groupby(rows, key=itemgetter(0)):
+                    image_list.add_dir(path, (name for _, name in names))
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return ImageList()
+
+        return image_list
+
+    @stats.timed("index_scan")
+    def scan(
+        self, source: str, on_listing: Callable[[DirListing], None] | None = None
+    ) -> ImageList:
+        """Bring the stored index up to date and return every image in the source.
+
+        on_listing receives each directory as soon as it is listed. Changes are
+        committed as the walk goes, so other writers never wait long, but the
+        mtimes of changed directories are only stored once the walk is done,
+        so an interrupted scan lists them again.
+        """
+        source = os.path.normpath(source)
+
+        try:
+            with self.lock, self.connect() as conn:
+                return self.update(conn, source, on_listing)
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+            return ImageList()
+
+    def update(
+        self,
+        conn: sqlite3.Connection,
+        source: str,
+        on_listing: Callable[[DirListing], None] | None,
+    ) -> ImageList:
+        dirs = self.query_dirs(conn, source)
+        files = self.query_files(conn, source)
+        children: dict[int, list[str]] = {}
+
+        for path, (_, _, parent) in dirs.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(path)
+
+        def known(path: str, mtime: int) -> tuple[list[str], list[str]] | None:
+            stored = dirs.get(path)
+
+            if not stored or stored[1] != mtime:
+                return None
+
+            dir_id = stored[0]
+            return files.get(dir_id, []), children.get(dir_id, [])
+
+        image_list = ImageList()
+        ids: dict[str, int] = {path: dir_id for path, (dir_id, _, _) in dirs.items()}
+        seen: set[str] = set()
+        mtimes: list[tuple[int, int]] = []
+        last_commit = time.monotonic()
+
+        def on_dir(listing: DirListing) -> None:
+            nonlocal last_commit
+            seen.add(listing.path)
+
+            if listing.changed:
+                parent = ids.get(listing.parent) if listing.parent else None
+                dir_id = self.store_dir(conn, listing.path, parent, listing.names)
+                ids[listing.path] = dir_id
+                mtimes.append((listing.mtime, dir_id))
+
+                if time.monotonic() - last_commit > self.commit_interval:
+                    conn.commit()
+                    last_commit = time.monotonic()
+
+            image_list.add_dir(listing.path, listing.names)
+
+            if on_listing:
+                on_listing(listing)
+
+        self.scanner.scan(source, on_dir, known)
+
+        conn.executemany("UPDATE dirs SET mtime = ? WHERE id = ?", mtimes)
+
+        # Forget directories that no longer exist
+        gone = [(dir_id,) for path, (dir_id, _, _) in dirs.items() if path not in seen]
+        conn.executemany("DELETE FROM files WHERE dir = ?", gone)
+        conn.executemany("DELETE FROM dirs WHERE id = ?", gone)
+
+        return image_list
+
+    def store_dir(
+        self,
+        conn: sqlite3.Connection,
+        path: str,
+        parent: int | None,
+        names: list[str],
+    ) -> int:
+        # No mtime until the walk is done, see scan
+        conn.execute(
+            "INSERT INTO dirs (path, parent, mtime) VALUES (?, ?, 0) "
+            "ON CONFLICT (path) DO UPDATE SET parent = excluded.parent, mtime = 0",
+            (path, parent),
+        )
+
+        row = conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+        dir_id: int = row[0]
+
+        # Keep the rows of files that are still there, with their metadata
+        rows = conn.execute("SELECT name FROM files WHERE dir = ?", (dir_id,))
+        stored = {name for (name,) in rows}
+        current = set(names)
+
+        conn.executemany(
+            "DELETE FROM files WHERE dir = ? AND name = ?",
+            [(dir_id, name) for name in stored - current],
+        )
+
+        conn.executemany(
+            "INSERT INTO files (dir, name) VALUES (?, ?)",
+            [(dir_id, name) for name in current - stored],
+        )
+
+        return dir_id
+
+    def missing_metadata(self, source: str, limit: int) -> list[tuple[int, str, str]]:
+        """Return dir id, name and directory of images without metadata."""
+        condition, params = self.source_filter(os.path.normpath(source))
+
+        try:
+            with self.connect() as conn:
+                rows = conn.execute(
+                    "SELECT files.dir, files.name, dirs.path FROM files "
+                    f"JOIN dirs ON dirs.id = files.dir WHERE {condition} "
+                    "AND files.width IS NULL LIMIT ?",
+                    (*params, limit),
+                )
+
+                return rows.fetchall()
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return []
+
+    def store_metadata(
+        self, rows: list[tuple[int, str, int, int, int, int, int]]
+    ) -> bool:
+        """Store dir id, name, mtime, size, width, height and orientation of images."""
+        try:
+            with self.connect() as conn:
+                conn.executemany(
+                    "UPDATE files SET mtime = ?, size = ?, width = ?, height = ?, "
+                    "orientation = ? WHERE dir = ? AND name = ?",
+                    [(*header, dir_id, name) for dir_id, name, *header in rows],
+                )
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+            return False
+
+        return True
+
+    def read_versions(
+        self, source: str, after: int, limit: int
+    ) -> list[tuple[int, str, str, int | None, int | None]]:
+        """Return row id, directory, name, mtime and size of images already read.
+
+        Rows come in row id order, starting after the given one.
+        """
+        condition, params = self.source_filter(os.path.normpath(source))
+
+        try:
+            with self.connect() as conn:
+                rows = conn.execute(
+                    "SELECT files.rowid, dirs.path, files.name, files.mtime, "
+                    "files.size FROM files JOIN dirs ON dirs.id = files.dir "
+                    f"WHERE {condition} AND files.width IS NOT NULL "
+                    "AND files.rowid > ? ORDER BY files.rowid LIMIT ?",
+                    (*params, after, limit),
+                )
+
+                return rows.fetchall()
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return []
+
+    def last_check(self, source: str) -> float:
+        """Return when the last full check of the source for changes finished."""
+        try:
+            with self.connect() as conn:
+                row = conn.execute(
+                    "SELECT finished FROM checks WHERE source = ?",
+                    (os.path.normpath(source),),
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return 0.0
+
+        return float(row[0]) if row else 0.0
+
+    def store_check(self, source: str, finished: float) -> None:
+        try:
+            with self.connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO checks (source, finished) VALUES (?, ?)",
+                    (os.path.normpath(source), finished),
+                )
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+
+    def store_versions(
+        self, versions: list[tuple[int, int, int]], changed: list[int]
+    ) -> bool:
+        """Store mtime, size and row id of images, and forget the changed ones."""
+        try:
+            with self.connect() as conn:
+                conn.executemany(
+                    "UPDATE files SET mtime = ?, size = ? WHERE rowid = ?", versions
+                )
+
+                conn.executemany(
+                    "UPDATE files SET width = NULL, height = NULL, "
+                    "orientation = NULL, phash = NULL, mtime = NULL, size = NULL "
+                    "WHERE rowid = ?",
+                    [(rowid,) for rowid in changed],
+                )
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+            return False
+
+        return True
+
+    def store_changes(
+        self,
+        added: list[tuple[Path, int, int, int, int, int, int]],
+        removed: list[Path],
+    ) -> None:
+        """Record the images the watcher saw come, change and go.
+
+        Added images come with their mtime, size, header and hash.
+
+        Directories are added without an mtime, so the next scan lists them.
+        """
+        try:
+            with self.connect() as conn:
+                for path, *metadata, phash in added:
+                    directory = str(path.parent)
+
+                    conn.execute(
+                        "INSERT INTO dirs (path, parent, mtime) "
+                        "VALUES (?, (SELECT id FROM dirs WHERE path = ?), 0) "
+                        "ON CONFLICT (path) DO NOTHING",
+                        (directory, str(path.parent.parent)),
+                    )
+
+                    conn.execute(
+                        "INSERT INTO files (dir, name, mtime, size, width, height, "
+                        "orientation, phash) SELECT id, ?, ?, ?, ?, ?, ?, ? "
+                        "FROM dirs WHERE path = ? ON CONFLICT (dir, name) DO UPDATE "
+                        "SET mtime = excluded.mtime, size = excluded.size, "
+                        "width = excluded.width, height = excluded.height, "
+                        "orientation = excluded.orientation, phash = excluded.phash",
+                        (path.name, *metadata, to_signed(phash), directory),
+                    )
+
+                conn.executemany(
+                    "DELETE FROM files WHERE name = ? "
+                    "AND dir = (SELECT id FROM dirs WHERE path = ?)",
+                    [(path.name, str(path.parent)) for path in removed],
+                )
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+
+    def filter_shape(self, paths: list[Path], shape: str) -> list[Path]:
+        """Return the paths of the images that match the shape."""
+        if shape not in ("Landscape", "Portrait"):
+            return paths
+
+        matched = []
+
+        try:
+            with self.connect() as conn:
+                for path in paths:
+                    row = conn.execute(
+                        "SELECT 1 FROM files JOIN dirs ON dirs.id = files.dir "
+                        "WHERE dirs.path = ? AND files.name = ? "
+                        f"AND {self.shape_filter(shape)}",
+                        (str(path.parent), path.name),
+                    ).fetchone()
+
+                    if row:
+                        matched.append(path)
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return paths
+
+        return matched
+
+    def load_quarantine(self) -> None:
+        """Read the quarantined files into memory."""
+        try:
+            with self.connect() as conn:
+                rows = conn.execute("SELECT path, mtime FROM quarantine")
+                self.quarantined = dict(rows)
+        except sqlite3.Error as e:
+            self.log(f"Error reading quarantine: {e}")
+
+    def quarantine(self, path: Path, reason: str) -> None:
+        """Skip a file that failed to load until its mtime changes."""
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            # The file is gone, the watcher will drop it from the list
+            return
+
+        self.quarantined[str(path)] = mtime
+        self.log(f"Quarantined {path}: {reason}")
+
+        self.write_quarantine(
+            "INSERT OR REPLACE INTO quarantine (path, mtime, reason) VALUES (?, ?, ?)",
+            (str(path), mtime, reason),
+        )
+
+    def is_quarantined(self, path: Path) -> bool:
+        """Check a file against the quarantine, releasing it if it changed."""
+        mtime = self.quarantined.get(str(path))
+
+        if mtime is None:
+            return False
+
+        try:
+            changed = path.stat().st_mtime_ns != mtime
+        except OSError:
+            # Gone from the disk, there is nothing left to retry
+            self.release(path)
+            return True
+
+        if changed:
+            self.release(path)
+
+        return not changed
+
+    def release(self, path: Path) -> None:
+        self.quarantined.pop(str(path), None)
+        self.write_quarantine("DELETE FROM quarantine WHERE path = ?", (str(path),))
+
+    def write_quarantine(self, sql: str, params: tuple[object, ...]) -> None:
+        """Queue a write for the writer thread, the UI never waits for a scan."""
+        self.writes.put((sql, params))
+
+        with self.writer_lock:
+            if not self.writer:
+                self.writer = threading.Thread(target=self.write_thread, daemon=True)
+                self.writer.start()
+
+    def write_thread(self) -> None:
+        while True:
+            sql, params = self.writes.get()
+
+            try:
+                with self.connect() as conn:
+                    conn.execute(sql, params)
+            except sqlite3.Error as e:
+                self.log(f"Error writing quarantine: {e}")
+
+    def missing_hashes(self, source: str, limit: int) -> list[tuple[int, str, str]]:
+        """Return dir id, name and directory of images without a hash."""
+        condition, params = self.source_filter(os.path.normpath(source))
+
+        try:
+            with self.connect() as conn:
+                rows = conn.execute(
+                    "SELECT files.dir, files.name, dirs.path FROM files "
+                    f"JOIN dirs ON dirs.id = files.dir WHERE {condition} "
+                    "AND files.phash IS NULL LIMIT ?",
+                    (*params, limit),
+                )
+
+                return rows.fetchall()
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return []
+
+    def store_hashes(self, rows: list[tuple[int, str, int]]) -> bool:
+        """Store dir id, name and the 64 bit hash of images."""
+        try:
+            with self.connect() as conn:
+                conn.executemany(
+                    "UPDATE files SET phash = ? WHERE dir = ? AND name = ?",
+                    [(to_signed(value), dir_id, name) for dir_id, name, value in rows],
+                )
+        except sqlite3.Error as e:
+            self.log(f"Error updating image index: {e}")
+            return False
+
+        return True
+
+    def get_hash(self, path: Path) -> int | None:
+        """Return the hash of an image, or None if it wasn't hashed yet."""
+        # Called for every pick, so without opening the database each time
+        try:
+            rows = self.reader().execute(
+                "SELECT files.phash FROM files JOIN dirs ON dirs.id = files.dir "
+                "WHERE dirs.path = ? AND files.name = ?",
+                (str(path.parent), path.name),
+            )
+
+            row = rows.fetchone()
+        except sqlite3.Error as e:
+            self.log(f"Error reading image index: {e}")
+            return None
+
+        if not row or row[0] is None:
+            return None
+
+        return int(row[0]) & MASK_64
+
+
+def to_signed(value: int) -> int:
+    # SQLite integers are signed 64 bit
+    return value - (1 << 64) if value >= 1 << 63 else value
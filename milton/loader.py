@@ -0,0 +1,111 @@
+# Standard
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .cache import DisplayCache
+from .decoder import DecodePool
+from .stats import stats
+from .render import Pyramid, decode_image, fit_image, fit_size
+
+
+@dataclass
+class LoadedImage:
+    """An image fitted to a frame, with its decoded source when available.
+
+    The source is decoded at display resolution, full_size is the size of
+    the original file. The pyramid is built on the first window resize.
+    """
+
+    path: Path
+    source: Image.Image | None
+    fitted: Image.Image
+    frame_size: tuple[int, int]
+    full_size: tuple[int, int]
+    pyramid: Pyramid | None = None
+
+
+class ImageLoader:
+    """Produce fitted renders, going through the display cache first.
+
+    Files are decoded in the pool when there is one, or in the calling thread.
+    """
+
+    def __init__(
+        self,
+        padding: float,
+        cache: DisplayCache | None = None,
+        pool: DecodePool | None = None,
+    ) -> None:
+        self.padding = padding
+        self.cache = cache
+        self.pool = pool
+
+    @stats.timed("loader_load")
+    def load(
+        self,
+        file_path: Path,
+        frame_size: tuple[int, int],
+        cancel: threading.Event | None = None,
+    ) -> LoadedImage:
+        """Return a render of the file fitted to the frame size."""
+        if self.cache:
+            fitted = self.cache.get(file_path, frame_size)
+
+            if fitted:
+                return LoadedImage(file_path, None, fitted, frame_size, fitted.size)
+
+        source, full_size = self.decode(file_path, frame_size, cancel)
+        loaded = LoadedImage(file_path, source, source, frame_size, full_size)
+        loaded = self.fit(loaded, frame_size)
+
+        # Cached here rather than in fit, which can run on the Tk thread
+        if self.cache:
+            self.cache.put(file_path, frame_size, loaded.fitted)
+
+        return loaded
+
+    def decode(
+        self,
+        file_path: Path,
+        frame_size: tuple[int, int],
+        cancel: threading.Event | None,
+    ) -> tuple[Image.Image, tuple[int, int]]:
+        if self.pool:
+            return self.pool.decode(file_path, frame_size, self.padding, cancel)
+
+        return decode_image(file_path, frame_size, self.padding)
+
+    def can_fit(self, loaded: LoadedImage, frame_size: tuple[int, int]) -> bool:
+        """Check if the image can be fitted to the frame size without a decode."""
+        source = loaded.source
+
+        if not source:
+            return False
+
+        # The reduced source can be too small for a larger frame
+        target = fit_size(loaded.full_size, frame_size, self.padding)
+
+        return source.size == loaded.full_size or (
+            target[0] <= source.width and target[1] <= source.height
+        )
+
+    def fit(self, loaded: LoadedImage, frame_size: tuple[int, int]) -> LoadedImage:
+        """Fit an already loaded image to a new frame size, decoding it if needed.
+
+        Not cached, so the sizes a window resize passes through stay off disk.
+        """
+        source = loaded.source
+
+        if not source or not self.can_fit(loaded, frame_size):
+            return self.load(loaded.path, frame_size)
+
+        fitted = fit_image(source, frame_size, self.padding)
+
+        return LoadedImage(
+            loaded.path, source, fitted, frame_size, loaded.full_size, loaded.pyramid
+        )
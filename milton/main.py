@@ -1,5 +1,8 @@
 # Standard
+import os
 import json
+import time
+import argparse
 from pathlib import Path
 
 # Libraries
@@ -7,9 +10,90 @@ import tkinter as tk
 
 # Modules
 from .dashboard import Dashboard
+from .stats import stats
+
+
+def address(value: str) -> tuple[str, int]:
+    """Parse the [HOST:]PORT address to serve on, all interfaces by default."""
+    host, _, port = value.rpartition(":")
+
+    try:
+        number = int(port)
+    except ValueError:
+        number = -1
+
+    if not 0 <= number <= 65535:
+        # Reported by argparse as an invalid address
+        raise ValueError(value)
+
+    return host or "0.0.0.0", number
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="milton")
+
+    parser.add_argument(
+        "--stats",
+        metavar="PATH",
+        default=os.environ.get("MILTON_STATS"),
+        help="Record per stage timings and dump them to this JSON file "
+        "(or set MILTON_STATS)",
+    )
+
+    parser.add_argument(
+        "--stats-interval",
+        metavar="SECONDS",
+        type=float,
+        default=60.0,
+        help="Seconds between stats dumps",
+    )
+
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        type=address,
+        help="Serve the slideshow to browsers over HTTP instead of opening a window",
+    )
+
+    parser.add_argument(
+        "--rapid-interval",
+        metavar="SECONDS",
+        type=float,
+        default=0.5,
+        help="Seconds between images at the Rapid speed",
+    )
+
+    parser.add_argument(
+        "--crossfade",
+        metavar="SECONDS",
+        type=float,
+        default=0.0,
+        help="Crossfade between images for this long, 0 to cut",
+    )
+
+    parser.add_argument(
+        "--startup-time",
+        action="store_true",
+        help="Log how long the window and the first frame take to show",
+    )
+
+    return parser.parse_args()
 
 
 def main() -> None:
+    started = time.perf_counter()
+    args = parse_args()
+
+    if args.stats:
+        stats.enable(Path(args.stats), args.stats_interval)
+
+    if args.serve:
+        from .server import serve
+
+        serve(args.serve)
+        stats.stop()
+        return
+
     manifest_path = Path("milton/manifest.json")
 
     if manifest_path.exists():
@@ -25,10 +109,20 @@ def main() -> None:
                 icon = tk.PhotoImage(file="icon.png")
                 root.iconphoto(True, icon)
 
-            app = Dashboard(root)
+            app = Dashboard(
+                root,
+                started if args.startup_time else None,
+                max(0.05, args.rapid_interval),
+                max(0.0, args.crossfade),
+            )
             root.configure(bg=app.bg_color)
             root.mainloop()
 
+            # Write state changes still waiting for the debounce
+            app.state_store.stop()
+
+    stats.stop()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+# Standard
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable
+
+# Modules
+from .stats import stats
+from .index import ImageIndex
+from .render import read_header
+from .phash import dhash_or_zero
+
+
+def header_or_unknown(path: Path) -> tuple[int, int, int]:
+    # Unreadable headers are stored as zeros so they aren't read again
+    try:
+        return read_header(path)
+    except Exception:
+        return 0, 0, 0
+
+
+def file_version(path: Path) -> tuple[int, int]:
+    # Files that are gone get zeros, which never match a stored version
+    try:
+        stat = path.stat()
+    except OSError:
+        return 0, 0
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_metadata(path: Path) -> tuple[int, int, int, int, int]:
+    """Return the mtime, size, width, height and orientation of an image."""
+    # The version comes first, a change during the read is seen next time
+    return *file_version(path), *header_or_unknown(path)
+
+
+@stats.timed("metadata")
+def extract_metadata(
+    index: ImageIndex,
+    source: str,
+    stopped: Callable[[], bool],
+    workers: int = 8,
+    batch: int = 256,
+) -> int:
+    """Store the size and orientation of every indexed image that lacks them.
+
+    Only headers are read. Works in batches so it can stop between them,
+    and returns the number of images that were read.
+    """
+    count = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while not stopped():
+            rows = index.missing_metadata(source, batch)
+
+            if not rows:
+                break
+
+            paths = [Path(path) / name for _, name, path in rows]
+            metadata = executor.map(read_metadata, paths)
+
+            stored = index.store_metadata(
+                [
+                    (dir_id, name, *values)
+                    for (dir_id, name, _), values in zip(rows, metadata, strict=True)
+                ]
+            )
+
+            if not stored:
+                break
+
+            count += len(rows)
+
+    return count
+
+
+@stats.timed("check_changes")
+def check_changes(
+    index: ImageIndex,
+    source: str,
+    stopped: Callable[[], bool],
+    workers: int = 8,
+    batch: int = 1024,
+    interval: float = 24 * 60 * 60,
+) -> int:
+    """Forget the metadata and hash of images that changed since they were read.
+
+    Writing a file in place leaves the mtime of its directory alone, so the
+    scan can't tell, and every image that was read is checked instead. That
+    is a stat per image, so it's skipped if a full pass finished within the
+    interval, the watcher sees changes while the app runs.
+    Returns the number of changed images.
+    """
+    if time.time() - index.last_check(source) < interval:
+        return 0
+
+    count = 0
+    after = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while not stopped():
+            rows = index.read_versions(source, after, batch)
+
+            if not rows:
+                index.store_check(source, time.time())
+                break
+
+            after = rows[-1][0]
+            paths = [Path(path) / name for _, path, name, _, _ in rows]
+            versions: list[tuple[int, int, int]] = []
+            changed: list[int] = []
+
+            for (rowid, _, _, mtime, size), version in zip(
+                rows, executor.map(file_version, paths), strict=True
+            ):
+                # Read before versions were stored, assume it's unchanged
+                if mtime is None:
+                    versions.append((*version, rowid))
+                elif (mtime, size) != version:
+                    changed.append(rowid)
+
+            if not index.store_versions(versions, changed):
+                break
+
+            count += len(changed)
+
+    return count
+
+
+def read_change(path: Path) -> tuple[Path, int, int, int, int, int, int]:
+    return path, *read_metadata(path), dhash_or_zero(path)
+
+
+def store_changes(
+    index: ImageIndex,
+    added: list[Path],
+    removed: list[Path],
+    workers: int = 8,
+) -> None:
+    """Store the images the watcher found in the index, with headers and hashes."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = list(executor.map(read_change, added))
+
+    index.store_changes(rows, removed)
@@ -0,0 +1,98 @@
+# Standard
+import math
+import time
+import tkinter as tk
+from collections.abc import Callable
+
+# Modules
+from .stats import stats
+
+
+class Pacer:
+    """Show frames at a fixed interval from the Tk event loop.
+
+    Every tick shows whatever frame is ready. A tick with nothing ready, or
+    one that came too late, is dropped instead of being caught up on later,
+    so a slow frame never makes the following ones queue up.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        interval: float,
+        show: Callable[[], bool],
+        log: Callable[[str], None],
+        report_interval: float = 10.0,
+    ) -> None:
+        self.root = root
+        self.interval = interval
+        self.show = show
+        self.log = log
+        self.report_interval = report_interval
+        self.job: str | None = None
+        self.start_time = 0.0
+        self.deadline = 0.0
+        self.ticks = 0
+        self.last_shown: float | None = None
+        self.reset_report(0.0)
+
+    def start(self) -> None:
+        self.stop()
+        self.start_time = time.perf_counter()
+        self.ticks = 0
+        self.last_shown = None
+        self.reset_report(self.start_time)
+        self.schedule()
+
+    def stop(self) -> None:
+        if self.job:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def schedule(self) -> None:
+        # Deadlines are fixed from the start so timer jitter doesn't add up
+        self.deadline = self.start_time + self.ticks * self.interval
+        # Rounded up, a tick that fires early would show two frames in a row
+        delay = max(0, math.ceil((self.deadline - time.perf_counter()) * 1000))
+        self.job = self.root.after(delay, self.on_tick)
+
+    def on_tick(self) -> None:
+        now = time.perf_counter()
+
+        # Deadlines that passed while the event loop was busy are dropped
+        missed = max(0, int((now - self.deadline) // self.interval))
+        self.ticks += missed + 1
+        self.dropped += missed
+
+        if self.show():
+            if self.last_shown is None:
+                # Rates are measured from the first frame on
+                self.reset_report(now)
+            else:
+                self.shown += 1
+                stats.record("frame_interval", now - self.last_shown)
+
+            self.last_shown = now
+        else:
+            self.dropped += 1
+
+        if now - self.report_start >= self.report_interval:
+            self.report(now)
+
+        self.schedule()
+
+    def report(self, now: float) -> None:
+        fps = self.shown / (now - self.report_start)
+        total = self.shown + self.dropped
+
+        self.log(
+            f"Rapid mode: {fps:.2f} fps of {1 / self.interval:.2f}, "
+            f"{self.dropped} of {total} frames dropped"
+        )
+
+        self.reset_report(now)
+
+    def reset_report(self, now: float) -> None:
+        self.report_start = now
+        self.shown = 0
+        self.dropped = 0
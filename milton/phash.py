@@ -0,0 +1,199 @@
+# Standard
+import os
+import sys
+import multiprocessing
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass, field
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .stats import stats
+from .index import ImageIndex
+
+
+def dhash(file_path: Path) -> int:
+    """Difference hash, one bit per pixel that is brighter than its right neighbour."""
+    with Image.open(file_path) as image:
+        # JPEG can decode at 1/8 scale, which is plenty for 9x8 pixels
+        image.draft("L", (72, 64))
+        small = image.convert("L").resize((9, 8), Image.Resampling.BOX)
+
+    pixels = small.tobytes()
+    value = 0
+
+    for row in range(0, 72, 9):
+        for left, right in zip(
+            pixels[row : row + 8], pixels[row + 1 : row + 9], strict=True
+        ):
+            value = (value << 1) | (left > right)
+
+    return value
+
+
+def dhash_or_zero(file_path: Path) -> int:
+    # Unreadable files get the hash of a flat image, which is never matched
+    try:
+        return dhash(file_path)
+    except Exception:
+        return 0
+
+
+def lower_priority() -> None:
+    if sys.platform != "win32":
+        os.nice(10)
+
+
+@stats.timed("phash")
+def hash_images(
+    index: ImageIndex,
+    source: str,
+    stopped: Callable[[], bool],
+    workers: int | None = None,
+    batch: int = 256,
+) -> int:
+    """Hash every indexed image that has no hash yet, using every core.
+
+    Works in batches so it can stop between them, and returns the number
+    of images that were hashed.
+    """
+    count = 0
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=lower_priority,
+    )
+
+    with executor:
+        while not stopped():
+            rows = index.missing_hashes(source, batch)
+
+            if not rows:
+                break
+
+            paths = [Path(path) / name for _, name, path in rows]
+            hashes = executor.map(dhash_or_zero, paths, chunksize=32)
+
+            stored = index.store_hashes(
+                [
+                    (dir_id, name, value)
+                    for (dir_id, name, _), value in zip(rows, hashes, strict=True)
+                ]
+            )
+
+            if not stored:
+                break
+
+            count += len(rows)
+
+    return count
+
+
+@dataclass
+class Node:
+    value: int
+    count: int = 1
+    children: dict[int, "Node"] = field(default_factory=dict)
+
+
+class BKTree:
+    """Hashes arranged by Hamming distance, so near ones are found without a scan.
+
+    Removal only lowers the count of a node, the tree is rebuilt by the owner
+    once too many dead nodes pile up.
+    """
+
+    def __init__(self) -> None:
+        self.root: Node | None = None
+        self.dead = 0
+
+    def add(self, value: int) -> None:
+        if not self.root:
+            self.root = Node(value)
+            return
+
+        node = self.root
+
+        while True:
+            distance = (value ^ node.value).bit_count()
+
+            if not distance:
+                if not node.count:
+                    self.dead -= 1
+
+                node.count += 1
+                return
+
+            child = node.children.get(distance)
+
+            if not child:
+                node.children[distance] = Node(value)
+                return
+
+            node = child
+
+    def remove(self, value: int) -> None:
+        node = self.root
+
+        while node:
+            distance = (value ^ node.value).bit_count()
+
+            if not distance:
+                if node.count:
+                    node.count -= 1
+                    self.dead += not node.count
+
+                return
+
+            node = node.children.get(distance)
+
+    def near(self, value: int, limit: int) -> bool:
+        """Check for a live hash within the Hamming distance limit."""
+        stack = [self.root] if self.root else []
+
+        while stack:
+            node = stack.pop()
+            distance = (value ^ node.value).bit_count()
+
+            if distance <= limit and node.count:
+                return True
+
+            # Only these subtrees can hold hashes within the limit
+            for key, child in node.children.items():
+                if distance - limit <= key <= distance + limit:
+                    stack.append(child)
+
+        return False
+
+
+class RecentHashes:
+    """The hashes of the last images picked, to keep near duplicates apart."""
+
+    def __init__(self, size: int, distance: int) -> None:
+        self.distance = distance
+        self.hashes: deque[int] = deque(maxlen=size)
+        self.tree = BKTree()
+
+    def add(self, value: int) -> None:
+        if not value:
+            return
+
+        if len(self.hashes) == self.hashes.maxlen:
+            self.tree.remove(self.hashes[0])
+
+        self.hashes.append(value)
+        self.tree.add(value)
+
+        if self.tree.dead > len(self.hashes):
+            self.tree = BKTree()
+
+            for recent in self.hashes:
+                self.tree.add(recent)
+
+    def near(self, value: int) -> bool:
+        return bool(value) and self.tree.near(value, self.distance)
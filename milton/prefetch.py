@@ -0,0 +1,115 @@
+# Standard
+import queue
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from collections.abc import Callable
+
+# Modules
+from .loader import LoadedImage
+
+
+@dataclass
+class Prefetched:
+    """An upcoming image that was decoded and fitted ahead of time."""
+
+    loaded: LoadedImage
+    generation: int
+
+
+class Prefetcher:
+    """Keep a small queue of random picks decoded in worker threads."""
+
+    def __init__(
+        self,
+        pick: Callable[[], Path | None],
+        load: Callable[[Path, tuple[int, int]], LoadedImage],
+        log: Callable[[str], None],
+        depth: int = 2,
+        workers: int = 1,
+    ) -> None:
+        self.pick = pick
+        self.load = load
+        self.log = log
+        self.workers = max(1, workers)
+        self.ready: queue.Queue[Prefetched] = queue.Queue(maxsize=max(1, depth))
+        self.frame_size: tuple[int, int] | None = None
+        self.generation = 0
+        self.stop_event = threading.Event()
+        self.size_event = threading.Event()
+        self.threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.size_event.set()
+
+    def set_frame_size(self, frame_size: tuple[int, int]) -> None:
+        """Fit upcoming images to a new frame size."""
+        if frame_size == self.frame_size:
+            return
+
+        self.frame_size = frame_size
+        self.size_event.set()
+
+    def clear(self) -> None:
+        """Drop every queued image, for example after the source changed."""
+        self.generation += 1
+
+        while True:
+            try:
+                self.ready.get_nowait()
+            except queue.Empty:
+                break
+
+    def take(self) -> Prefetched | None:
+        """Return the next ready image without blocking."""
+        while True:
+            try:
+                item = self.ready.get_nowait()
+            except queue.Empty:
+                return None
+
+            if item.generation == self.generation:
+                return item
+
+    def worker(self) -> None:
+        while not self.stop_event.is_set():
+            frame_size = self.frame_size
+
+            if not frame_size:
+                self.size_event.wait()
+                continue
+
+            generation = self.generation
+            path = self.pick()
+
+            if not path:
+                self.stop_event.wait(0.5)
+                continue
+
+            try:
+                loaded = self.load(path, frame_size)
+            except Exception as e:
+                self.log(f"Error prefetching image: {e}")
+                self.stop_event.wait(0.5)
+                continue
+
+            self.put(Prefetched(loaded, generation))
+
+    def put(self, item: Prefetched) -> None:
+        while not self.stop_event.is_set():
+            if item.generation != self.generation:
+                return
+
+            try:
+                self.ready.put(item, timeout=0.5)
+            except queue.Full:
+                continue
+            else:
+                return
@@ -0,0 +1,192 @@
+# Standard
+from pathlib import Path
+
+# Libraries
+from PIL import Image
+
+# Modules
+from .stats import stats
+
+# EXIF orientation tag and the transpose that undoes each orientation
+ORIENTATION = 0x0112
+
+TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def fit_size(
+    image_size: tuple[int, int], frame_size: tuple[int, int], padding: float
+) -> tuple[int, int]:
+    """Calculate the size an image should have to fit inside the frame."""
+    img_width, img_height = image_size
+    frame_width, frame_height = frame_size
+
+    image_aspect = img_width / img_height
+    frame_aspect = frame_width / frame_height
+
+    if image_aspect > frame_aspect:
+        new_width = frame_width
+        new_height = int(frame_width / image_aspect)
+    else:
+        new_height = frame_height
+        new_width = int(frame_height * image_aspect)
+
+    max_height = int(frame_height * padding)
+
+    if new_height > max_height:
+        new_height = max_height
+        new_width = int(max_height * image_aspect)
+
+    return max(1, new_width), max(1, new_height)
+
+
+@stats.timed("resize")
+def fit_image(
+    image: Image.Image, frame_size: tuple[int, int], padding: float
+) -> Image.Image:
+    """Resize an image so it fits inside the frame."""
+    new_size = fit_size(image.size, frame_size, padding)
+    return image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def letterbox(
+    image: Image.Image, frame_size: tuple[int, int], bg_color: str
+) -> Image.Image:
+    """Center a fitted image on a background that fills the frame."""
+    frame_width, frame_height = frame_size
+    final_image = Image.new("RGB", frame_size, bg_color)
+
+    x_offset = (frame_width - image.width) // 2
+    y_offset = (frame_height - image.height) // 2
+
+    # Transparent areas show the background
+    mask = image if image.mode == "RGBA" else None
+    final_image.paste(image, (x_offset, y_offset), mask)
+
+    return final_image
+
+
+class Letterbox:
+    """A frame sized canvas that is reused for every image of the same size.
+
+    The returned canvas changes on the next render, so it must be consumed
+    right away, for example by pasting it into a PhotoImage.
+    """
+
+    def __init__(self, bg_color: str) -> None:
+        self.bg_color = bg_color
+        self.canvas: Image.Image | None = None
+        self.box: tuple[int, int, int, int] | None = None
+
+    def render(self, image: Image.Image, frame_size: tuple[int, int]) -> Image.Image:
+        """Center a fitted image on the canvas, allocating it only on resize."""
+        if not self.canvas or self.canvas.size != frame_size:
+            self.canvas = Image.new("RGB", frame_size, self.bg_color)
+        elif self.box:
+            # Only the area under the previous image needs clearing
+            self.canvas.paste(self.bg_color, self.box)
+
+        x_offset = (frame_size[0] - image.width) // 2
+        y_offset = (frame_size[1] - image.height) // 2
+        mask = image if image.mode == "RGBA" else None
+        self.canvas.paste(image, (x_offset, y_offset), mask)
+
+        self.box = (
+            max(0, x_offset),
+            max(0, y_offset),
+            min(frame_size[0], x_offset + image.width),
+            min(frame_size[1], y_offset + image.height),
+        )
+
+        return self.canvas
+
+
+def read_orientation(image: Image.Image) -> int:
+    orientation = image.getexif().get(ORIENTATION, 1)
+    return orientation if orientation in TRANSPOSE else 1
+
+
+def oriented_size(size: tuple[int, int], orientation: int) -> tuple[int, int]:
+    """The size of an image once its orientation is applied."""
+    if orientation in (5, 6, 7, 8):
+        return size[1], size[0]
+
+    return size
+
+
+def read_header(file_path: Path) -> tuple[int, int, int]:
+    """Return the stored width, height and orientation without decoding pixels."""
+    with Image.open(file_path) as pil_image:
+        width, height = pil_image.size
+        return width, height, read_orientation(pil_image)
+
+
+@stats.timed("decode")
+def decode_image(
+    file_path: Path, frame_size: tuple[int, int], padding: float
+) -> tuple[Image.Image, tuple[int, int]]:
+    """Decode an image at the smallest resolution that still covers the frame.
+
+    Returns the decoded image upright and the original size from the header,
+    with the EXIF orientation applied to both.
+    """
+    with Image.open(file_path) as pil_image:
+        orientation = read_orientation(pil_image)
+        full_size = oriented_size(pil_image.size, orientation)
+
+        # The target is computed upright, then turned back to the stored layout
+        target = oriented_size(fit_size(full_size, frame_size, padding), orientation)
+
+        # JPEG can scale by 1/2, 1/4 or 1/8 while decoding (DCT scaling)
+        if pil_image.format == "JPEG":
+            pil_image.draft(pil_image.mode, target)
+
+        pil_image.load()
+        image: Image.Image = pil_image
+
+        # Palette images can only be resampled well in a true color mode
+        if image.mode in ("1", "P"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        factor = min(image.width // target[0], image.height // target[1])
+
+        if factor >= 2:
+            image = image.reduce(factor)
+
+        if orientation in TRANSPOSE:
+            image = image.transpose(TRANSPOSE[orientation])
+
+        if image is pil_image:
+            return image.copy(), full_size
+
+        return image, full_size
+
+
+class Pyramid:
+    """Copies of an image that are each half the size of the previous one."""
+
+    def __init__(self, image: Image.Image, min_size: int = 64) -> None:
+        self.levels = [image]
+
+        while min(self.levels[-1].size) // 2 >= min_size:
+            self.levels.append(self.levels[-1].reduce(2))
+
+    def level_for(self, size: tuple[int, int]) -> Image.Image:
+        """Return the smallest level that still covers the size."""
+        for level in reversed(self.levels):
+            if level.width >= size[0] and level.height >= size[1]:
+                return level
+
+        return self.levels[0]
+
+    def preview(self, frame_size: tuple[int, int], padding: float) -> Image.Image:
+        """Fit the image to the frame quickly, for use while resizing."""
+        new_size = fit_size(self.levels[0].size, frame_size, padding)
+        return self.level_for(new_size).resize(new_size, Image.Resampling.BILINEAR)
@@ -0,0 +1,106 @@
+# Standard
+import os
+from pathlib import Path
+from dataclasses import dataclass
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+@dataclass
+class DirListing:
+    """The image files and subdirectories found in one directory."""
+
+    path: str
+    parent: str | None
+    mtime: int
+    names: list[str]
+    subdirs: list[str]
+    changed: bool
+
+
+# Returns the stored names and subdirectories if the directory is unchanged
+Known = Callable[[str, int], tuple[list[str], list[str]] | None]
+
+
+class Scanner:
+    """Walk a directory tree with os.scandir, listing subtrees concurrently."""
+
+    def __init__(
+        self, formats: tuple[str, ...], log: Callable[[str], None], workers: int = 8
+    ) -> None:
+        self.formats = formats
+        self.log = log
+        self.workers = max(1, workers)
+
+    def scan(
+        self,
+        source: str,
+        on_dir: Callable[[DirListing], None],
+        known: Known | None = None,
+    ) -> None:
+        """Walk the source and stream every directory listing to on_dir.
+
+        on_dir always runs on the calling thread, and a parent is always
+        reported before its subdirectories.
+        """
+        with ThreadPoolExecutor(self.workers) as pool:
+            pending: set[Future[DirListing | None]] = {
+                pool.submit(self.visit, source, None, known)
+            }
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    listing = future.result()
+
+                    if not listing:
+                        continue
+
+                    on_dir(listing)
+
+                    for subdir in listing.subdirs:
+                        pending.add(
+                            pool.submit(self.visit, subdir, listing.path, known)
+                        )
+
+    def visit(
+        self, path: str, parent: str | None, known: Known | None
+    ) -> DirListing | None:
+        try:
+            mtime = Path(path).stat().st_mtime_ns
+        except OSError:
+            return None
+
+        stored = known(path, mtime) if known else None
+
+        if stored is not None:
+            names, subdirs = stored
+            return DirListing(path, parent, mtime, names, subdirs, changed=False)
+
+        try:
+            names, subdirs = self.list_dir(path)
+        except OSError as e:
+            self.log(f"Error scanning directory: {e}")
+            return None
+
+        return DirListing(path, parent, mtime, names, subdirs, changed=True)
+
+    def list_dir(self, path: str) -> tuple[list[str], list[str]]:
+        """List the image files and the subdirectories of a directory."""
+        names = []
+        subdirs = []
+
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif not entry.is_dir() and entry.name.lower().endswith(
+                        self.formats
+                    ):
+                        names.append(entry.name)
+                except OSError:
+                    continue
+
+        return names, subdirs
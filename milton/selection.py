@@ -0,0 +1,279 @@
+# Standard
+import random
+import threading
+from pathlib import Path
+from collections.abc import Callable
+
+# Modules
+from .state import State
+from .index import ImageIndex
+from .images import ImageList
+from .scanner import DirListing, Scanner
+from .watcher import Watcher
+from .shuffle import Shuffle
+from .phash import RecentHashes, hash_images
+from .metadata import check_changes, extract_metadata, store_changes
+
+
+class Selection:
+    """The images of the source and the order they are picked in.
+
+    Shared by the window and the server. Picks can come from several threads
+    at once, and the scan callbacks run on the scan thread.
+    """
+
+    def __init__(
+        self,
+        state: State,
+        index: ImageIndex,
+        scanner: Scanner,
+        save: Callable[[State], None],
+        log: Callable[[str], None],
+        attempts: int = 20,
+        distinct_window: int = 100,
+        distinct_distance: int = 10,
+    ) -> None:
+        self.state = state
+        self.index = index
+        self.scanner = scanner
+        self.save = save
+        self.log = log
+        self.attempts = attempts
+        self.image_list = ImageList()
+        self.watcher: Watcher | None = None
+        self.scan_id = 0
+        self.load_id = 0
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.shuffle: Shuffle | None = None
+        self.shuffle_lock = threading.Lock()
+        self.recent_hashes = RecentHashes(distinct_window, distinct_distance)
+        self.recent_lock = threading.Lock()
+
+    def scan(
+        self, on_found: Callable[[], None], on_filtered: Callable[[], None]
+    ) -> None:
+        """Load the stored index and rescan changes in the background.
+
+        on_found is called once the stored images are loaded, or once images
+        are found in a source that was not indexed before, and again when the
+        scan is done. on_filtered is called when the list was filtered again
+        with newly read shapes. Nothing is picked until the list is loaded.
+        """
+        source = self.state.source
+
+        with self.lock:
+            self.stop_watcher()
+            self.scan_id += 1
+            self.load_id += 1
+            scan_id = self.scan_id
+            self.image_list = ImageList()
+            self.loaded = False
+
+        threading.Thread(
+            target=self.scan_thread,
+            args=(source, scan_id, on_found, on_filtered),
+            daemon=True,
+        ).start()
+
+    def scan_thread(
+        self,
+        source: str,
+        scan_id: int,
+        on_found: Callable[[], None],
+        on_filtered: Callable[[], None],
+    ) -> None:
+        """Thread function to bring the image index up to date."""
+        listings: list[DirListing] = []
+
+        def stale() -> bool:
+            return scan_id != self.scan_id
+
+        self.index.load_quarantine()
+
+        if not self.load_list(stale):
+            return
+
+        # Without a stored index, stream images into the list as they are found
+        pool: ImageList | None = None
+
+        if self.image_list:
+            on_found()
+        else:
+            pool = self.image_list
+
+        def on_listing(listing: DirListing) -> None:
+            listings.append(listing)
+
+            if pool is None or not listing.names or stale():
+                return
+
+            first = not pool
+            pool.add_dir(listing.path, listing.names)
+
+            if first:
+                on_found()
+
+        self.index.scan(source, on_listing)
+
+        # Reload from the index so the order is the same on every start,
+        # which keeps a persisted shuffle position meaningful
+        image_list = self.index.load(source, self.state.shape)
+
+        # Ignore scans of a source that was replaced in the meantime
+        with self.lock:
+            if stale():
+                return
+
+            self.image_list = image_list
+            self.watcher = Watcher(self.scanner, listings, self.on_change, self.log)
+            self.watcher.start()
+
+        on_found()
+
+        # Read the headers of new and changed images, then filter again
+        check_changes(self.index, source, stale)
+        read = extract_metadata(self.index, source, stale)
+
+        if read and self.state.shape != "Any" and self.load_list(stale):
+            self.reset_shuffle()
+            on_filtered()
+
+        # Hash new and changed images in the background for the Distinct order
+        hash_images(self.index, source, stale)
+
+    def on_change(self, added: list[Path], removed: list[Path]) -> None:
+        # Read the headers of new images, so they go through the shape filter
+        store_changes(self.index, added, removed)
+        matched = self.index.filter_shape(added, self.state.shape)
+        self.image_list.add(matched)
+
+        # A changed image may not match the shape anymore
+        self.image_list.remove([*removed, *set(added).difference(matched)])
+
+    def reload(self, on_done: Callable[[], None]) -> None:
+        """Load the image list from the index again in the background.
+
+        The current filter is used, and on_done is called from the loading
+        thread once the new list is in use.
+        """
+        with self.lock:
+            self.load_id += 1
+            load_id = self.load_id
+
+        threading.Thread(
+            target=self.reload_thread, args=(load_id, on_done), daemon=True
+        ).start()
+
+    def reload_thread(self, load_id: int, on_done: Callable[[], None]) -> None:
+        if self.load_list(lambda: load_id != self.load_id):
+            self.reset_shuffle()
+            on_done()
+
+    def load_list(self, stale: Callable[[], bool]) -> bool:
+        """Use the list stored for the source, unless it was replaced meanwhile."""
+        image_list = self.index.load(self.state.source, self.state.shape)
+
+        with self.lock:
+            if stale():
+                return False
+
+            self.image_list = image_list
+            self.loaded = True
+
+        return True
+
+    def stop(self) -> None:
+        """Stop watching the source, and the background passes of the last scan."""
+        with self.lock:
+            self.stop_watcher()
+            self.scan_id += 1
+
+    def stop_watcher(self) -> None:
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def pick(self) -> Path | None:
+        """Pick the next image in the current order."""
+        fallback = None
+
+        # Picking from the empty list would also start a new shuffle
+        if not self.loaded:
+            return None
+
+        # Bounded so a source of quarantined files can't loop forever
+        for _ in range(self.attempts):
+            if self.state.order == "Shuffle":
+                path = self.pick_shuffled()
+            else:
+                path = self.image_list.choice()
+
+            if not path:
+                return None
+
+            if self.index.is_quarantined(path):
+                continue
+
+            if self.state.order == "Distinct" and not self.is_distinct(path):
+                fallback = path
+                continue
+
+            return path
+
+        # Better a near duplicate than nothing
+        return fallback
+
+    def is_distinct(self, path: Path) -> bool:
+        """Check a pick against the recent ones, remembering it if it's distinct."""
+        value = self.index.get_hash(path)
+
+        if value is None:
+            return True
+
+        with self.recent_lock:
+            if self.recent_hashes.near(value):
+                return False
+
+            self.recent_hashes.add(value)
+
+        return True
+
+    def pick_shuffled(self) -> Path | None:
+        """Pick the next image of a permutation that covers the whole source."""
+        image_list = self.image_list
+
+        with self.shuffle_lock:
+            # Bounded so a list of removed images can't loop forever
+            for _ in range(image_list.slots + 1):
+                if self.state.shuffle_pos >= self.state.shuffle_size:
+                    self.start_shuffle(image_list.slots)
+
+                if not self.state.shuffle_size:
+                    return None
+
+                if not self.shuffle:
+                    self.shuffle = Shuffle(
+                        self.state.shuffle_size, self.state.shuffle_seed
+                    )
+
+                slot = self.shuffle[self.state.shuffle_pos]
+                self.state.shuffle_pos += 1
+                path = image_list.get(slot)
+
+                if path:
+                    self.save(self.state)
+                    return path
+
+        return None
+
+    def start_shuffle(self, size: int) -> None:
+        """Start a new pass over the images with a fresh permutation."""
+        self.state.shuffle_seed = random.getrandbits(63)
+        self.state.shuffle_size = size
+        self.state.shuffle_pos = 0
+        self.shuffle = None
+
+    def reset_shuffle(self) -> None:
+        with self.shuffle_lock:
+            self.start_shuffle(0)
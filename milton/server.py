@@ -0,0 +1,366 @@
+# Standard
+import io
+import sys
+import json
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Libraries
+from PIL import features
+
+# Modules
+from .state import State, StateStore
+from .index import ImageIndex
+from .scanner import Scanner
+from .selection import Selection
+from .decoder import DecodePool
+from .loader import ImageLoader
+from .render import letterbox
+from .defaults import bg_color, default_source, formats, padding
+from .words import open_noun_list, pick_words
+from .stats import stats
+
+# Seconds between images for each speed, Pause never advances. Browsers
+# poll every 2 seconds, so Rapid can't go any faster than that
+intervals = {"Rapid": 2.0, "Fast": 60.0, "Normal": 300.0, "Slow": 600.0}
+
+# Identifies an encoded frame: image id, width, height and format
+FrameKey = tuple[int, int, int, str]
+
+PAGE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Milton</title>
+<style>
+  body { margin: 0; height: 100vh; display: flex; flex-direction: column;
+         background: #808080; font-family: Arial, sans-serif; }
+  #words { display: flex; justify-content: center; gap: 1em; padding: 10px;
+           font-size: 1.4em; }
+  #frame { flex: 1; min-height: 0; }
+  #image { width: 100%; height: 100%; object-fit: contain; }
+</style>
+</head>
+<body>
+<div id="words"></div>
+<div id="frame"><img id="image" alt=""></div>
+<script>
+let shown = null;
+
+async function update() {
+  try {
+    const current = await (await fetch("current.json")).json();
+    const frame = document.getElementById("frame");
+    const scale = window.devicePixelRatio || 1;
+    const width = Math.round(frame.clientWidth * scale);
+    const height = Math.round(frame.clientHeight * scale);
+    const src = `${current.image}&w=${width}&h=${height}`;
+
+    if (current.id !== null && src !== shown) {
+      document.getElementById("image").src = src;
+      shown = src;
+    }
+
+    const words = document.getElementById("words");
+    words.replaceChildren(...current.words.map((word) => {
+      const span = document.createElement("span");
+      span.textContent = word;
+      return span;
+    }));
+  } catch (e) {
+    console.error(e);
+  }
+}
+
+update();
+setInterval(update, 2000);
+window.addEventListener("resize", update);
+</script>
+</body>
+</html>
+"""
+
+
+def log(message: str) -> None:
+    sys.stderr.write(message + "\n")
+
+
+class FrameCache:
+    """Encoded frames in a size bounded LRU, each one rendered only once.
+
+    A request for a frame that is already being rendered waits for that
+    render instead of starting its own.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[FrameKey, bytes] = OrderedDict()
+        self.rendering: dict[FrameKey, threading.Event] = {}
+        self.total = 0
+
+    def get(self, key: FrameKey, render: Callable[[], bytes]) -> bytes:
+        while True:
+            with self.lock:
+                data = self.entries.get(key)
+
+                if data is not None:
+                    self.entries.move_to_end(key)
+                    return data
+
+                event = self.rendering.get(key)
+
+                if not event:
+                    event = self.rendering[key] = threading.Event()
+                    break
+
+            # Try again once it's done, the render might have failed
+            event.wait()
+
+        data = None
+
+        try:
+            data = render()
+        finally:
+            with self.lock:
+                del self.rendering[key]
+
+                if data is not None:
+                    self.put(key, data)
+
+            event.set()
+
+        return data
+
+    def put(self, key: FrameKey, data: bytes) -> None:
+        self.entries[key] = data
+        self.total += len(data)
+
+        while self.total > self.budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total -= len(evicted)
+
+
+class Slideshow:
+    """The image and the words shown to every client, advanced on a timer."""
+
+    def __init__(
+        self,
+        state: State,
+        selection: Selection,
+        loader: ImageLoader,
+        noun_list: Sequence[str],
+        cache_budget: int,
+    ) -> None:
+        self.state = state
+        self.selection = selection
+        self.loader = loader
+        self.noun_list = noun_list
+        self.frames = FrameCache(cache_budget)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.image_id = 0
+        self.words: list[str] = []
+
+        # Recent images, so clients that are a step behind can still load theirs
+        self.images: OrderedDict[int, Path] = OrderedDict()
+
+    def start(self) -> None:
+        self.selection.scan(self.advance_if_empty, lambda: None)
+        self.advance_if_empty()
+        threading.Thread(target=self.advance_loop, daemon=True).start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.selection.stop()
+
+    def advance_loop(self) -> None:
+        interval = None
+
+        # Unknown speeds play at Normal
+        if self.state.speed != "Pause":
+            interval = intervals.get(self.state.speed, intervals["Normal"])
+
+        while not self.stop_event.wait(interval):
+            self.advance()
+
+    def advance_if_empty(self) -> None:
+        if not self.image_id:
+            self.advance()
+
+    def advance(self) -> None:
+        """Move every client on to a new image and new words."""
+        path = self.selection.pick()
+
+        if not path:
+            return
+
+        with self.lock:
+            self.image_id += 1
+            self.images[self.image_id] = path
+            self.words = pick_words(self.noun_list, int(self.state.nouns or 3))
+
+            while len(self.images) > 8:
+                self.images.popitem(last=False)
+
+    def current(self) -> dict[str, object]:
+        with self.lock:
+            image_id = self.image_id or None
+
+            return {
+                "id": image_id,
+                "words": self.words,
+                "image": f"image?id={image_id}",
+                "interval": intervals.get(self.state.speed),
+            }
+
+    def frame(self, image_id: int, size: tuple[int, int], fmt: str) -> bytes | None:
+        """Return the encoded image fitted to the size, or None if it expired."""
+        with self.lock:
+            path = self.images.get(image_id)
+
+        if not path:
+            return None
+
+        def render() -> bytes:
+            return self.render(path, size, fmt)
+
+        return self.frames.get((image_id, *size, fmt), render)
+
+    @stats.timed("server_render")
+    def render(self, path: Path, size: tuple[int, int], fmt: str) -> bytes:
+        try:
+            loaded = self.loader.load(path, size)
+        except Exception as e:
+            self.selection.index.quarantine(path, f"{type(e).__name__}: {e}")
+            raise
+
+        image = letterbox(loaded.fitted, size, bg_color)
+        output = io.BytesIO()
+
+        if fmt == "webp":
+            image.save(output, "WEBP", quality=80)
+        else:
+            image.save(output, "JPEG", quality=85)
+
+        return output.getvalue()
+
+
+def make_handler(slideshow: Slideshow) -> type[BaseHTTPRequestHandler]:
+    webp = features.check("webp")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            if url.path == "/":
+                self.send(200, "text/html; charset=utf-8", PAGE.encode("utf-8"))
+            elif url.path == "/current.json":
+                body = json.dumps(slideshow.current()).encode("utf-8")
+                self.send(200, "application/json", body, cache=False)
+            elif url.path == "/image":
+                self.send_image(query)
+            else:
+                self.send(404, "text/plain", b"Not found")
+
+        def send_image(self, query: dict[str, list[str]]) -> None:
+            try:
+                image_id = int(query["id"][0])
+                width = min(max(int(query.get("w", ["1280"])[0]), 16), 4096)
+                height = min(max(int(query.get("h", ["720"])[0]), 16), 4096)
+            except (KeyError, ValueError):
+                self.send(400, "text/plain", b"Bad request")
+                return
+
+            fmt = (
+                "webp"
+                if webp and "image/webp" in self.headers.get("Accept", "")
+                else "jpeg"
+            )
+
+            try:
+                data = slideshow.frame(image_id, (width, height), fmt)
+            except Exception as e:
+                log(f"Error rendering image: {e}")
+                self.send(500, "text/plain", b"Error rendering image")
+                return
+
+            if data is None:
+                self.send(404, "text/plain", b"Image expired")
+            else:
+                self.send(200, f"image/{fmt}", data)
+
+        def send(
+            self, status: int, content_type: str, body: bytes, cache: bool = True
+        ) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+
+            # Image URLs never change content, the current image does
+            if cache and status == 200:
+                self.send_header("Cache-Control", "max-age=3600")
+            else:
+                self.send_header("Cache-Control", "no-store")
+
+            self.send_header("Vary", "Accept")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            # Dozens of clients polling would flood the log
+            pass
+
+    return Handler
+
+
+def serve(address: tuple[str, int], cache_budget: int = 256 * 1024 * 1024) -> None:
+    """Serve the slideshow of the saved source to browsers until interrupted."""
+    host, port = address
+    root = Path(__file__).parent
+    store = StateStore(root / "state.json", log)
+    state = store.load()
+
+    if not state.source:
+        state.source = default_source
+
+    scanner = Scanner(formats, log)
+    index = ImageIndex(root / "index.db", scanner, log)
+    selection = Selection(state, index, scanner, store.save, log)
+    pool = DecodePool(log, workers=4)
+    loader = ImageLoader(padding, pool=pool)
+    noun_list: Sequence[str]
+
+    try:
+        noun_list = open_noun_list(root / "nouns.txt", root / "nouns.bin", log)
+    except Exception as e:
+        log(f"Error reading nouns.txt: {e}")
+        noun_list = ["Error", "Loading", "Words"]
+
+    slideshow = Slideshow(state, selection, loader, noun_list, cache_budget)
+
+    try:
+        server = ThreadingHTTPServer((host, port), make_handler(slideshow))
+    except OSError as e:
+        log(f"Error serving on {host}:{port}: {e}")
+        pool.stop()
+        return
+
+    server.daemon_threads = True
+    slideshow.start()
+    log(f"Serving {state.source} on http://{host}:{port}/")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        slideshow.stop()
+        pool.stop()
+        store.stop()
@@ -0,0 +1,52 @@
+MASK_64 = (1 << 64) - 1
+
+
+class Shuffle:
+    """A pseudo random permutation of range(size), computed one index at a time.
+
+    Uses a small Feistel network with cycle walking, so walking the whole
+    permutation needs constant memory no matter how large the size is.
+    """
+
+    rounds = 4
+
+    def __init__(self, size: int, seed: int) -> None:
+        self.size = size
+        self.seed = seed & MASK_64
+
+        # The network works on an even number of bits that covers the size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+
+        value = self.permute(index)
+
+        # Walk the cycle until the value lands inside the range again
+        while value >= self.size:
+            value = self.permute(value)
+
+        return value
+
+    def permute(self, value: int) -> int:
+        left = value >> self.half_bits
+        right = value & self.half_mask
+
+        for n in range(self.rounds):
+            left, right = right, left ^ self.round(n, right)
+
+        return (left << self.half_bits) | right
+
+    def round(self, n: int, value: int) -> int:
+        # splitmix64 finalizer keyed with the seed and the round number
+        x = (value ^ (self.seed + n * 0x9E3779B97F4A7C15)) & MASK_64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+        return (x ^ (x >> 31)) & self.half_mask
@@ -1,4 +1,120 @@
+# Standard
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Any
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, fields
+
+
+@dataclass
 class State:
     source: str = ""
     speed: str = "Normal"
     nouns: str = "3"
+    order: str = "Random"
+    shape: str = "Any"
+    shuffle_seed: int = 0
+    shuffle_size: int = 0
+    shuffle_pos: int = 0
+
+
+class StateStore:
+    """Persist the state as JSON, coalescing rapid changes into one write.
+
+    Writes happen on a background thread through a temporary file that
+    replaces the old one, so a crash never leaves a partial file behind.
+    """
+
+    def __init__(
+        self, path: Path, log: Callable[[str], None], delay: float = 2.0
+    ) -> None:
+        self.path = path
+        self.log = log
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.pending: dict[str, Any] | None = None
+        self.written: dict[str, Any] | None = None
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def load(self) -> State:
+        """Read the state, keeping the default of every missing or invalid field."""
+        state = State()
+
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return state
+        except (OSError, ValueError) as e:
+            self.log(f"Error loading state file: {e}")
+            return state
+
+        if not isinstance(data, dict):
+            return state
+
+        for field in fields(State):
+            value = data.get(field.name)
+
+            if type(value) is type(getattr(state, field.name)):
+                setattr(state, field.name, value)
+
+        self.written = asdict(state)
+        return state
+
+    def save(self, state: State) -> None:
+        """Schedule a write of the state as it is now."""
+        with self.lock:
+            self.pending = asdict(state)
+
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+        self.wake_event.set()
+
+    def stop(self) -> None:
+        """Write any pending change right away and stop the writer."""
+        self.stop_event.set()
+        self.wake_event.set()
+
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            self.wake_event.wait()
+
+            # Let the changes that follow in quick succession join this write
+            self.stop_event.wait(self.delay)
+            self.wake_event.clear()
+            self.flush()
+
+        self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            snapshot = self.pending
+            self.pending = None
+
+        if snapshot is None or snapshot == self.written:
+            return
+
+        try:
+            self.write(snapshot)
+        except OSError as e:
+            self.log(f"Error saving state file: {e}")
+        else:
+            self.written = snapshot
+
+    def write(self, snapshot: dict[str, Any]) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        tmp_path.replace(self.path)
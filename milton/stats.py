@@ -0,0 +1,158 @@
+# Standard
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from bisect import bisect_left
+from functools import wraps
+from collections.abc import Callable
+from typing import Any, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Bucket upper bounds in seconds, from 0.1 ms up to about half an hour
+BOUNDS = tuple(0.0001 * 2**n for n in range(25))
+
+# Receives a snapshot of every histogram on each dump
+Sink = Callable[[dict[str, Any]], None]
+
+
+class Histogram:
+    """Durations counted in exponential buckets."""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.buckets[bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket that holds the percentile."""
+        target = self.count * percent / 100
+        seen = 0
+
+        for index, count in enumerate(self.buckets):
+            seen += count
+
+            if count and seen >= target:
+                return BOUNDS[index] if index < len(BOUNDS) else self.max
+
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        def ms(seconds: float) -> float:
+            return round(seconds * 1000, 3)
+
+        return {
+            "count": self.count,
+            "total_ms": ms(self.total),
+            "mean_ms": ms(self.total / self.count) if self.count else 0,
+            "min_ms": ms(self.min) if self.count else 0,
+            "max_ms": ms(self.max),
+            "p50_ms": ms(self.percentile(50)),
+            "p99_ms": ms(self.percentile(99)),
+            "buckets": [
+                [ms(BOUNDS[index]) if index < len(BOUNDS) else None, count]
+                for index, count in enumerate(self.buckets)
+                if count
+            ],
+        }
+
+
+class Stats:
+    """Opt-in per stage timing, dumped periodically to a JSON file and sinks."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.sinks: list[Sink] = []
+        self.stop_event = threading.Event()
+
+    def enable(self, path: Path | None = None, interval: float = 60.0) -> None:
+        """Start recording, and dump every interval seconds if there is a sink."""
+        self.enabled = True
+
+        if path:
+            self.add_sink(lambda snapshot: write_json(path, snapshot))
+
+        threading.Thread(target=self.dump_loop, args=(interval,), daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop the periodic dumps after a final one."""
+        if self.enabled:
+            self.stop_event.set()
+            self.dump()
+
+    def add_sink(self, sink: Sink) -> None:
+        self.sinks.append(sink)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get(stage)
+
+            if not histogram:
+                histogram = self.histograms[stage] = Histogram()
+
+            histogram.add(seconds)
+
+    def timed(self, stage: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        """Decorator that records the duration of every call when enabled."""
+
+        def decorator(func: Callable[P, R]) -> Callable[P, R]:
+            @wraps(func)
+            def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+
+                start = time.perf_counter()
+
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            stages = {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+        return {"time": time.time(), "pid": os.getpid(), "stages": stages}
+
+    def dump(self) -> None:
+        snapshot = self.snapshot()
+
+        for sink in self.sinks:
+            try:
+                sink(snapshot)
+            except Exception as e:
+                sys.stderr.write(f"Error in stats sink: {e}\n")
+
+    def dump_loop(self, interval: float) -> None:
+        while not self.stop_event.wait(interval):
+            self.dump()
+
+
+def write_json(path: Path, snapshot: dict[str, Any]) -> None:
+    """Replace the file atomically so readers never see a partial dump."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(snapshot, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+# Shared by every module so stages can be timed without passing it around
+stats = Stats()
@@ -0,0 +1,161 @@
+# Standard
+import time
+import queue
+import threading
+import tkinter as tk
+from dataclasses import dataclass, field
+from collections.abc import Callable
+
+# Libraries
+from PIL import Image
+
+
+@dataclass
+class Fade:
+    """One crossfade, shared by the Tk thread and the worker that blends it."""
+
+    source: Image.Image
+    target: Image.Image
+    steps: int
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+    # Step and buffer of the frames that are ready to show, in order
+    ready: queue.Queue[tuple[int, int]] = field(default_factory=queue.Queue)
+
+    # Set while the Tk thread isn't showing a buffer, so it can be blended into
+    released: list[threading.Event] = field(
+        default_factory=lambda: [threading.Event(), threading.Event()]
+    )
+
+
+class Crossfade:
+    """Blend from the frame on screen to the next one in a worker thread.
+
+    Frames are blended into two buffers in turn, and the Tk thread picks them
+    up on its own timer, so the worker never calls into Tk and cancelling
+    never waits for it. The buffers are reallocated only when the frame size
+    changes, the two images to blend are copied once per fade.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        show: Callable[[Image.Image], None],
+        fps: float = 20.0,
+    ) -> None:
+        self.root = root
+        self.show = show
+        self.fps = fps
+        self.fade: Fade | None = None
+        self.source: Image.Image | None = None
+        self.thread: threading.Thread | None = None
+        self.job: str | None = None
+        self.frames: list[Image.Image] = []
+
+    def capture(self, source: Image.Image) -> None:
+        """Copy the frame on screen, before it changes, to fade from."""
+        self.cancel()
+        self.source = source.copy()
+
+    def start(self, target: Image.Image, duration: float) -> None:
+        """Fade from the captured frame to a copy of the target."""
+        source = self.source
+        self.source = None
+
+        if not source or source.size != target.size:
+            self.show(target)
+            return
+
+        fade = self.fade = Fade(
+            source, target.copy(), max(1, round(duration * self.fps))
+        )
+
+        for event in fade.released:
+            event.set()
+
+        # The buffers are handed from one worker to the next
+        self.thread = threading.Thread(
+            target=self.run, args=(fade, self.thread), daemon=True
+        )
+
+        self.thread.start()
+        self.schedule()
+
+    def cancel(self) -> None:
+        """Stop the running fade, its worker stops on its own."""
+        if self.job:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+        if self.fade:
+            self.fade.cancel.set()
+            self.fade = None
+
+    def schedule(self) -> None:
+        # Twice per frame, so a frame never waits long to be shown
+        self.job = self.root.after(max(1, round(500 / self.fps)), self.on_timer)
+
+    def on_timer(self) -> None:
+        self.job = None
+        fade = self.fade
+
+        if not fade:
+            return
+
+        step, n = 0, None
+
+        # Show the newest frame, skipping those the event loop was too late for
+        while True:
+            try:
+                step, latest = fade.ready.get_nowait()
+            except queue.Empty:
+                break
+
+            if n is not None:
+                fade.released[n].set()
+
+            n = latest
+
+        if n is not None:
+            self.show(self.frames[n])
+            fade.released[n].set()
+
+        # The last frame is exactly the target
+        if step == fade.steps:
+            self.fade = None
+        else:
+            self.schedule()
+
+    def run(self, fade: Fade, previous: threading.Thread | None) -> None:
+        # A cancelled worker may still be blending into the buffers
+        if previous:
+            previous.join()
+
+        size = fade.source.size
+
+        if not self.frames or self.frames[0].size != size:
+            self.frames = [Image.new("RGB", size), Image.new("RGB", size)]
+            self.mask = Image.new("L", size)
+
+        start = time.perf_counter()
+        interval = 1 / self.fps
+
+        for step in range(1, fade.steps + 1):
+            n = step % 2
+            frame = self.frames[n]
+
+            # Wait until the Tk thread is done with the last frame in this buffer
+            while not fade.released[n].wait(0.05):
+                if fade.cancel.is_set():
+                    return
+
+            fade.released[n].clear()
+            frame.paste(fade.source)
+            self.mask.paste(round(255 * step / fade.steps), (0, 0, *size))
+            frame.paste(fade.target, None, self.mask)
+
+            # Keep a steady pace
+            if fade.cancel.wait(max(0, start + step * interval - time.perf_counter())):
+                return
+
+            fade.ready.put((step, n))
@@ -0,0 +1,298 @@
+# Standard
+import os
+import sys
+import ctypes
+import select
+import struct
+import threading
+import ctypes.util
+from pathlib import Path
+from dataclasses import dataclass
+from collections.abc import Callable, Iterable
+
+# Modules
+from .scanner import DirListing, Scanner
+
+# Flags from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+# Receives the added or changed and the removed image paths
+Changes = Callable[[list[Path], list[Path]], None]
+
+
+@dataclass
+class DirState:
+    """What the watcher last saw in a directory."""
+
+    mtime: int
+    names: set[str]
+    subdirs: set[str]
+
+
+class Inotify:
+    """Minimal ctypes binding to the Linux inotify API."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.add_watch_fn = libc.inotify_add_watch
+        self.add_watch_fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.rm_watch_fn = libc.inotify_rm_watch
+        self.rm_watch_fn.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.wds: dict[int, str] = {}
+        self.paths: dict[str, int] = {}
+
+    def add_watch(self, path: str) -> None:
+        wd = self.add_watch_fn(self.fd, os.fsencode(path), WATCH_MASK)
+
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}")
+
+        self.wds[wd] = path
+        self.paths[path] = wd
+
+    def rm_watch(self, path: str) -> None:
+        wd = self.paths.pop(path, None)
+
+        if wd is not None:
+            self.wds.pop(wd, None)
+            self.rm_watch_fn(self.fd, wd)
+
+    def read(self, timeout: float) -> list[tuple[str, int, str]]:
+        """Wait for events and return them as (directory, mask, name)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_IGNORED:
+                path = self.wds.pop(wd, None)
+
+                if path:
+                    self.paths.pop(path, None)
+
+                continue
+
+            events.append((self.wds.get(wd, ""), mask, name))
+
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    """Keep the image list current by watching the source for changes.
+
+    Uses inotify on Linux and falls back to polling directory mtimes
+    when inotify is not available or runs out of watches.
+    """
+
+    def __init__(
+        self,
+        scanner: Scanner,
+        listings: Iterable[DirListing],
+        on_change: Changes,
+        log: Callable[[str], None],
+        interval: float = 10.0,
+    ) -> None:
+        self.scanner = scanner
+        self.on_change = on_change
+        self.log = log
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.inotify: Inotify | None = None
+
+        self.dirs = {
+            listing.path: DirState(
+                listing.mtime, set(listing.names), set(listing.subdirs)
+            )
+            for listing in listings
+        }
+
+    def start(self) -> None:
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> None:
+        if sys.platform == "linux":
+            try:
+                self.start_inotify()
+            except OSError as e:
+                self.log(f"Watching with inotify failed, polling instead: {e}")
+                self.close_inotify()
+
+        try:
+            while not self.stop_event.is_set():
+                if self.inotify:
+                    self.read_inotify()
+                elif not self.stop_event.wait(self.interval):
+                    self.poll()
+        finally:
+            self.close_inotify()
+
+    def start_inotify(self) -> None:
+        self.inotify = Inotify()
+
+        for path in self.dirs:
+            self.inotify.add_watch(path)
+
+    def close_inotify(self) -> None:
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+    def read_inotify(self) -> None:
+        if not self.inotify:
+            return
+
+        added: list[Path] = []
+        removed: list[Path] = []
+
+        for parent, mask, name in self.inotify.read(0.5):
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, compare the directories with the disk
+                self.poll()
+                continue
+
+            state = self.dirs.get(parent)
+
+            if not state or not name:
+                continue
+
+            path = str(Path(parent) / name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    added.extend(self.add_tree(parent, path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    removed.extend(self.remove_tree(parent, path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                # Files written in place are reported again, to be read again
+                if name.lower().endswith(self.scanner.formats):
+                    state.names.add(name)
+                    added.append(Path(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM) and name in state.names:
+                state.names.discard(name)
+                removed.append(Path(path))
+
+        self.report(added, removed)
+
+    def poll(self) -> None:
+        """List the directories whose mtime changed and report the difference."""
+        added: list[Path] = []
+        removed: list[Path] = []
+
+        for path in list(self.dirs):
+            state = self.dirs.get(path)
+
+            if not state:
+                continue
+
+            try:
+                mtime = Path(path).stat().st_mtime_ns
+
+                if mtime == state.mtime:
+                    continue
+
+                names, subdirs = self.scanner.list_dir(path)
+            except OSError:
+                # The parent will notice that this directory is gone
+                continue
+
+            state.mtime = mtime
+            new_names = set(names)
+            added.extend(Path(path) / name for name in new_names - state.names)
+            removed.extend(Path(path) / name for name in state.names - new_names)
+            state.names = new_names
+
+            for subdir in set(subdirs) - state.subdirs:
+                added.extend(self.add_tree(path, subdir))
+
+            for subdir in state.subdirs - set(subdirs):
+                removed.extend(self.remove_tree(path, subdir))
+
+        self.report(added, removed)
+
+    def add_tree(self, parent: str, path: str) -> list[Path]:
+        """Start watching a new directory and return the images inside it."""
+        added: list[Path] = []
+
+        def on_dir(listing: DirListing) -> None:
+            if listing.path in self.dirs:
+                return
+
+            self.dirs[listing.path] = DirState(
+                listing.mtime, set(listing.names), set(listing.subdirs)
+            )
+
+            if self.inotify:
+                try:
+                    self.inotify.add_watch(listing.path)
+                except OSError as e:
+                    self.log(f"Watching with inotify failed, polling instead: {e}")
+                    self.close_inotify()
+
+            added.extend(Path(listing.path) / name for name in listing.names)
+
+        self.dirs[parent].subdirs.add(path)
+        self.scanner.scan(path, on_dir)
+        return added
+
+    def remove_tree(self, parent: str, path: str) -> list[Path]:
+        """Stop watching a directory that is gone and return its images."""
+        removed: list[Path] = []
+        stack = [path]
+
+        if parent in self.dirs:
+            self.dirs[parent].subdirs.discard(path)
+
+        while stack:
+            current = stack.pop()
+            state = self.dirs.pop(current, None)
+
+            if not state:
+                continue
+
+            if self.inotify:
+                self.inotify.rm_watch(current)
+
+            removed.extend(Path(current) / name for name in state.names)
+            stack.extend(state.subdirs)
+
+        return removed
+
+    def report(self, added: list[Path], removed: list[Path]) -> None:
+        if (added or removed) and not self.stop_event.is_set():
+            self.on_change(added, removed)
@@ -0,0 +1,145 @@
+# Standard
+import sys
+import mmap
+import random
+import struct
+from array import array
+from pathlib import Path
+from collections.abc import Callable, Sequence
+from typing import overload
+
+# Magic, version, source mtime, source size and word count
+HEADER = struct.Struct("<4sIqqQ")
+MAGIC = b"MNIX"
+VERSION = 1
+OFFSET = struct.Struct("<Q")
+
+
+def read_noun_list(nouns_path: Path) -> list[str]:
+    """Read a word list with one word per line."""
+    with nouns_path.open("r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def open_noun_list(
+    nouns_path: Path, index_path: Path, log: Callable[[str], None]
+) -> Sequence[str]:
+    """Map the compiled index, or read the text file if it can't be built."""
+    try:
+        return NounIndex.open(nouns_path, index_path)
+    except (OSError, ValueError, struct.error) as e:
+        log(f"Error opening {index_path.name}, reading {nouns_path.name}: {e}")
+
+    return read_noun_list(nouns_path)
+
+
+class NounIndex(Sequence[str]):
+    """A word list compiled to offsets plus packed UTF-8 and memory mapped.
+
+    Words are decoded one at a time when sampled, so startup time and
+    resident memory don't grow with the size of the list.
+    """
+
+    def __init__(self, index_path: Path) -> None:
+        with index_path.open("rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.size: int = HEADER.unpack_from(self.map, 0)[4]
+        self.words_start = HEADER.size + (self.size + 1) * OFFSET.size
+
+    @classmethod
+    def open(cls, nouns_path: Path, index_path: Path) -> "NounIndex":
+        """Map the compiled index, rebuilding it if the text file changed."""
+        if not cls.is_current(nouns_path, index_path):
+            cls.build(nouns_path, index_path)
+
+        return cls(index_path)
+
+    @staticmethod
+    def is_current(nouns_path: Path, index_path: Path) -> bool:
+        try:
+            stat = nouns_path.stat()
+
+            with index_path.open("rb") as f:
+                header = f.read(HEADER.size)
+        except OSError:
+            return False
+
+        if len(header) < HEADER.size:
+            return False
+
+        magic, version, mtime, size, _ = HEADER.unpack(header)
+
+        return (magic, version, mtime, size) == (
+            MAGIC,
+            VERSION,
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+
+    @staticmethod
+    def build(nouns_path: Path, index_path: Path) -> None:
+        """Compile the text file, replacing the index atomically."""
+        stat = nouns_path.stat()
+        offsets: array[int] = array("Q", [0])
+        words = bytearray()
+
+        with nouns_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+
+                if word:
+                    words += word.encode("utf-8")
+                    offsets.append(len(words))
+
+        count = len(offsets) - 1
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+
+        # The offsets are stored little endian like the header
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        header = HEADER.pack(MAGIC, VERSION, stat.st_mtime_ns, stat.st_size, count)
+
+        try:
+            with tmp_path.open("wb") as f:
+                f.write(header)
+                offsets.tofile(f)
+                f.write(words)
+
+            tmp_path.replace(index_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def __len__(self) -> int:
+        return self.size
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        position = HEADER.size + index * OFFSET.size
+        start, end = struct.unpack_from("<QQ", self.map, position)
+        words_start = self.words_start
+        return self.map[words_start + start : words_start + end].decode("utf-8")
+
+
+def pick_words(noun_list: Sequence[str], count: int) -> list[str]:
+    """Pick random words, without repeats when the list is long enough."""
+    if len(noun_list) >= count:
+        return random.sample(noun_list, count)
+
+    return random.choices(noun_list, k=count)